@@ -0,0 +1,72 @@
+"""
+Sharded run check: finished shards are reused only while the word lists are unchanged.
+
+Scores a small synthetic corpus with ``run_sharded``, checks the merged
+output against a single ``run_vocabulate_analysis`` run, then edits the
+dictionary (and afterwards the stopwords file) in place and runs the same
+call again. Each rerun must rescore the shards and match a fresh single run
+with the edited file; a rerun with nothing changed must reuse every shard.
+
+Usage:
+    python benchmarks/check_sharding.py
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lemo_vocabulate import get_data_path, run_vocabulate_analysis
+from lemo_vocabulate.sharding import LocalBackend, run_sharded
+
+def main() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = os.path.join(tmp_dir, "corpus")
+        os.makedirs(corpus)
+        dict_file = os.path.join(tmp_dir, "dictionary.csv")
+        stopwords_file = os.path.join(tmp_dir, "stopwords.txt")
+        shutil.copy(get_data_path("AEV_Dict.csv"), dict_file)
+        shutil.copy(get_data_path("stopwords.txt"), stopwords_file)
+        with open(dict_file, encoding="utf-8") as f:
+            original = f.read()
+        words = original.replace(",", " ").split()
+        rng = random.Random(1)
+        for i in range(12):
+            with open(os.path.join(corpus, f"doc{i:03d}.txt"), "w", encoding="utf-8") as f:
+                f.write(" ".join(rng.choice(words + ["the", "and"]) for _ in range(rng.randint(5, 200))))
+
+        options = {"dict_file": dict_file, "stopwords_file": stopwords_file}
+        work_dir = os.path.join(tmp_dir, "work")
+        output = os.path.join(tmp_dir, "sharded.csv")
+        reference = os.path.join(tmp_dir, "single.csv")
+
+        def run(label: str, expect_reused: bool):
+            nonlocal failures
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log), contextlib.redirect_stderr(io.StringIO()):
+                run_sharded(corpus, output, work_dir, num_shards=3, backend=LocalBackend(2), **options)
+                run_vocabulate_analysis(input_data=corpus, output_file=reference, **options)
+            with open(output, "rb") as f, open(reference, "rb") as g:
+                same = f.read() == g.read()
+            reused = "3 of 3 shard(s) already done" in log.getvalue()
+            ok = same and reused == expect_reused
+            failures += not ok
+            print(f"{label}: {'OK' if ok else 'FAILED'} (matches single run: {same}, shards reused: {reused})")
+
+        run("first run", expect_reused=False)
+        run("unchanged rerun", expect_reused=True)
+        with open(dict_file, "w", encoding="utf-8") as f:
+            f.write(original.replace("X", ""))    # every category emptied
+        run("dictionary edited", expect_reused=False)
+        with open(stopwords_file, "a", encoding="utf-8") as f:
+            f.write("\n" + "\n".join(words[:20]) + "\n")
+        run("stopwords edited", expect_reused=False)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
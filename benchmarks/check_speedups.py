@@ -0,0 +1,198 @@
+"""
+Correctness and speed check for the hot loops.
+
+First checks the kernels in use (compiled if installed, else pure Python)
+end to end: ``tokenize``, ``tokenize_for_analysis`` and ``match_dictionary``
+in every capture mode must reproduce the outputs in
+benchmarks/reference/matching.json, which were produced by the original
+1.0.2 implementation. When a compiled build is installed, the pure-Python
+kernels are checked against the same reference (in a subprocess with
+LEMO_VOCABULATE_PURE_PYTHON=1), then the compiled and pure-Python
+``lemo_vocabulate._speedups`` are run side by side on synthetic corpora and
+dictionaries (several seeds, wildcard and multi-word mixes, every capture
+mode) and timed on the same matching and tokenization workload. Any
+difference fails the check.
+
+Usage:
+    python benchmarks/check_speedups.py
+    python benchmarks/check_speedups.py --seeds 20 --texts 2000 --require-compiled
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lemo_vocabulate import get_data_path, speedups
+from lemo_vocabulate.dictionary import DictionaryData, LoadDictionary, match_dictionary
+from lemo_vocabulate.stopwords import StopWordRemover, load_stopwords_from_file
+from lemo_vocabulate.tokenizer import TwitterAwareTokenizer
+from synthetic import make_corpus, make_vocabulary, write_dictionary
+
+CAPTURES = (speedups.kernels.CAPTURE_NONE, speedups.kernels.CAPTURE_TEXT, speedups.kernels.CAPTURE_OFFSETS)
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference", "matching.json")
+
+def load_dictionary(path: str) -> DictionaryData:
+    return LoadDictionary().load_dictionary_file(DictionaryData(), path, "utf-8", ",", '"')
+
+def check_reference() -> int:
+    """Mismatches of the kernels in use against the stored reference outputs."""
+    with open(REFERENCE, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    tokenizer = TwitterAwareTokenizer()
+    stop_remover = StopWordRemover()
+    stop_remover.build_stoplist(load_stopwords_from_file(get_data_path("stopwords.txt")))
+    mismatches = texts = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for number, case in enumerate(cases):
+            path = os.path.join(tmp_dir, f"reference_{number}.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(case["dictionary"])
+            dict_data = load_dictionary(path)
+            for text, (words, counts, matched, captured, nonmatched) in zip(case["texts"], case["outputs"]):
+                texts += 1
+                _, words_raw, words_clean = tokenizer.tokenize_for_analysis(text, stop_remover.stopwords)
+                spans_counts, spans_matched, spans, spans_nonmatched = match_dictionary(dict_data, words_clean,
+                                                                                         "offsets")
+                results = {
+                    "tokenize": (tokenizer.tokenize(text), words),
+                    "tokenize_for_analysis": (words_raw, words),
+                    "match_dictionary": (match_dictionary(dict_data, words_clean),
+                                         (counts, matched, captured, nonmatched)),
+                    "match_dictionary(capture=None)": (match_dictionary(dict_data, words_clean, None),
+                                                       (counts, matched, '', nonmatched)),
+                    "match_dictionary(capture='offsets')": (
+                        (spans_counts, spans_matched, ' '.join(' '.join(words_clean[start:end]) for start, end in spans),
+                         spans_nonmatched),
+                        (counts, matched, captured, nonmatched)),
+                }
+                for name, (actual, expected) in results.items():
+                    if list(actual) != list(expected):
+                        mismatches += 1
+                        if mismatches <= 10:
+                            print(f"{name}: {text!r}\n  expected {expected}\n  got      {actual}")
+    kind = "compiled" if speedups.COMPILED else "pure Python"
+    print(f"reference ({kind}): {texts} texts, {'OK' if not mismatches else f'{mismatches} MISMATCHES'}")
+    return mismatches
+
+def check_pure_reference() -> int:
+    """``check_reference`` for the pure-Python kernels, in a fresh interpreter that cannot load the compiled build."""
+    env = dict(os.environ, LEMO_VOCABULATE_PURE_PYTHON="1")
+    return subprocess.call([sys.executable, os.path.abspath(__file__), "--reference-only"], env=env)
+
+def fresh_memos(dict_data: DictionaryData):
+    # Each implementation starts from empty wildcard memos, so neither reuses the other's results
+    for index in dict_data.wildcard_index.values():
+        index._memo, index._walks = {}, {}
+
+def outputs(kernels, dict_data: DictionaryData, texts, tokenizer: TwitterAwareTokenizer, stopwords) -> list:
+    fresh_memos(dict_data)
+    emoticon_match = tokenizer.emoticon_re.match
+    results = []
+    for text in texts:
+        raw = tokenizer._find_words(text, True)
+        words = kernels.lowercase_tokens(raw, emoticon_match)
+        clean = kernels.remove_stopwords(words, stopwords)
+        results.append((words, clean, kernels.remove_stopwords(words, stopwords, False),
+                        kernels.count_split_words(text)))
+        for capture in CAPTURES:
+            results.append(kernels.match_tokens(dict_data.standards_trie.root, dict_data.wildcard_index,
+                                                dict_data.max_words, clean, capture))
+    return results
+
+def check_parity(compiled, pure, args) -> int:
+    tokenizer = TwitterAwareTokenizer()
+    stop_remover = StopWordRemover()
+    stop_remover.build_stoplist(load_stopwords_from_file(get_data_path("stopwords.txt")))
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for seed in range(args.seeds):
+            vocabulary = make_vocabulary(args.vocabulary, seed=seed)
+            texts = [text for _, text in make_corpus(vocabulary, n_texts=args.texts, mean_words=args.words, seed=seed)]
+            texts += ["", "   ", "http://x.co/a/b a/b/c ./x //", "HAPPY :D XD ;P Ünïcödé ÀÉÎ", "a " * 500]
+            path = write_dictionary(os.path.join(tmp_dir, f"dict_{seed}.csv"), vocabulary, n_entries=args.entries,
+                                    n_categories=8, wildcard_ratio=(seed % 5) / 4, multiword_ratio=0.1 + (seed % 3) / 5,
+                                    seed=seed)
+            dict_data = load_dictionary(path)
+            expected = outputs(pure, dict_data, texts, tokenizer, stop_remover.stopwords)
+            actual = outputs(compiled, dict_data, texts, tokenizer, stop_remover.stopwords)
+            bad = sum(1 for a, b in zip(expected, actual) if a != b) + abs(len(expected) - len(actual))
+            print(f"seed {seed:3d}: {len(texts)} texts, {'OK' if not bad else f'{bad} MISMATCHES'}")
+            mismatches += bad
+    return mismatches
+
+def time_kernels(kernels, dict_data: DictionaryData, texts, tokenizer: TwitterAwareTokenizer, stopwords,
+                 repeat: int) -> dict:
+    emoticon_match = tokenizer.emoticon_re.match
+    raw = [tokenizer._find_words(text, True) for text in texts]
+    clean = [kernels.remove_stopwords(kernels.lowercase_tokens(words, emoticon_match), stopwords) for words in raw]
+    root, wildcard_index, max_words = dict_data.standards_trie.root, dict_data.wildcard_index, dict_data.max_words
+    workloads = {
+        "match_tokens": lambda: [kernels.match_tokens(root, wildcard_index, max_words, words, 1) for words in clean],
+        "lowercase + stopwords": lambda: [kernels.remove_stopwords(kernels.lowercase_tokens(words, emoticon_match),
+                                                                   stopwords) for words in raw],
+        "count_split_words": lambda: [kernels.count_split_words(text) for text in texts],
+    }
+    fresh_memos(dict_data)
+    timings = {}
+    for name, func in workloads.items():
+        func()  # warm the wildcard memos
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=10, help="synthetic corpus/dictionary pairs to compare")
+    parser.add_argument("--texts", type=int, default=500, help="texts per corpus")
+    parser.add_argument("--words", type=int, default=40, help="mean words per text")
+    parser.add_argument("--vocabulary", type=int, default=3000, help="distinct words per corpus")
+    parser.add_argument("--entries", type=int, default=1500, help="dictionary entries")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload (best is kept)")
+    parser.add_argument("--require-compiled", action="store_true", help="fail if no compiled build is installed")
+    parser.add_argument("--reference-only", action="store_true",
+                        help="only check the kernels in use against the stored reference outputs")
+    args = parser.parse_args()
+
+    if check_reference():
+        sys.exit(1)
+    if args.reference_only:
+        return
+    compiled, pure = speedups.load(), speedups.load(pure=True)
+    if not speedups.is_compiled(compiled):
+        print("No compiled build of lemo_vocabulate._speedups is installed; only pure Python was checked.")
+        sys.exit(1 if args.require_compiled else 0)
+    print(f"compiled: {compiled.__file__}")
+    if check_pure_reference():
+        sys.exit(1)
+
+    mismatches = check_parity(compiled, pure, args)
+    if mismatches:
+        print(f"FAILED: {mismatches} outputs differ between compiled and pure Python")
+        sys.exit(1)
+
+    vocabulary = make_vocabulary(args.vocabulary, seed=0)
+    texts = [text for _, text in make_corpus(vocabulary, n_texts=args.texts * 4, mean_words=args.words, seed=0)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dict_data = load_dictionary(write_dictionary(os.path.join(tmp_dir, "bench.csv"), vocabulary,
+                                                     n_entries=args.entries, wildcard_ratio=0.5, seed=0))
+    stop_remover = StopWordRemover()
+    stop_remover.build_stoplist(load_stopwords_from_file(get_data_path("stopwords.txt")))
+    tokenizer = TwitterAwareTokenizer()
+    slow = time_kernels(pure, dict_data, texts, tokenizer, stop_remover.stopwords, args.repeat)
+    fast = time_kernels(compiled, dict_data, texts, tokenizer, stop_remover.stopwords, args.repeat)
+    print(f"\n{'workload':<24} {'pure':>10} {'compiled':>10} {'speedup':>8}")
+    for name in slow:
+        print(f"{name:<24} {slow[name] * 1000:8.1f}ms {fast[name] * 1000:8.1f}ms {slow[name] / fast[name]:7.2f}x")
+
+if __name__ == "__main__":
+    main()
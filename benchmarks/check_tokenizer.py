@@ -0,0 +1,56 @@
+"""
+Tokenizer regression check against stored reference tokens.
+
+benchmarks/reference/tokens.json holds edge-case texts (newline and
+lengthening runs, ellipses, emoticons, URLs, phone numbers) and seeded
+random strings, with the tokens the original 1.0.2 tokenizer produced for
+them. Every tokenization path the analysis uses must reproduce them:
+``tokenize``, ``tokenize_for_analysis``, ``tokenize_ids`` (texts of
+``scoring.INTERN_MIN_CHARS`` or more) and the windowed path for very long
+texts.
+
+Usage:
+    python benchmarks/check_tokenizer.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lemo_vocabulate import get_data_path
+from lemo_vocabulate.speedups import remove_stopwords
+from lemo_vocabulate.stopwords import StopWordRemover, load_stopwords_from_file
+from lemo_vocabulate.tokenizer import TwitterAwareTokenizer
+from lemo_vocabulate.windowed import text_chunks
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference", "tokens.json")
+
+def tokenizations(tokenizer: TwitterAwareTokenizer, stop_remover: StopWordRemover, text: str) -> dict:
+    """The raw (or, for tokenize_ids, cleaned) tokens of ``text`` from each tokenization path."""
+    _, words_raw, _ = tokenizer.tokenize_for_analysis(text, stop_remover.stopwords)
+    _, _, words_clean = tokenizer.tokenize_ids(text, stop_remover.vocabulary)
+    windowed = [word for chunk in text_chunks(text, 8) for word in tokenizer.tokenize(chunk)]
+    return {"tokenize": tokenizer.tokenize(text), "tokenize_for_analysis": words_raw,
+            "tokenize_ids": words_clean, "windowed": windowed}
+
+def main() -> int:
+    with open(REFERENCE, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    tokenizer = TwitterAwareTokenizer()
+    stop_remover = StopWordRemover()
+    stop_remover.build_stoplist(load_stopwords_from_file(get_data_path("stopwords.txt")))
+
+    failures = 0
+    for text, expected in cases:
+        expected_clean = remove_stopwords(expected, stop_remover.stopwords)
+        for path, tokens in tokenizations(tokenizer, stop_remover, text).items():
+            if tokens != (expected_clean if path == "tokenize_ids" else expected):
+                failures += 1
+                if failures <= 10:
+                    print(f"{path}: {text!r}\n  expected {expected}\n  got      {tokens}")
+    print(f"{len(cases)} texts: {'OK' if not failures else f'{failures} MISMATCHES'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Throughput and memory benchmarks for LEMO Vocabulate.
+
+Times the tokenizer, dictionary loading, dictionary matching and the full
+analysis on synthetic data, and optionally compares against a saved run.
+
+Usage:
+    python benchmarks/run_benchmarks.py --texts 5000 --entries 2000 --wildcard-ratio 0.5
+    python benchmarks/run_benchmarks.py --save baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --tolerance 0.15
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from lemo_vocabulate import __version__, run_vocabulate_analysis, get_data_path, speedups
+from lemo_vocabulate.dictionary import DictionaryData, LoadDictionary, match_dictionary
+from lemo_vocabulate.stopwords import StopWordRemover, load_stopwords_from_file
+from lemo_vocabulate.tokenizer import TwitterAwareTokenizer
+from synthetic import make_corpus, make_vocabulary, write_dictionary
+
+def measure(func, repeat: int = 3):
+    """Best wall time over ``repeat`` runs, and peak traced memory of one run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def run(args) -> dict:
+    vocabulary = make_vocabulary(args.vocabulary, seed=args.seed)
+    corpus = make_corpus(vocabulary, n_texts=args.texts, mean_words=args.words, seed=args.seed)
+    texts = [text for _, text in corpus]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dict_file = write_dictionary(os.path.join(tmp_dir, "bench_dict.csv"), vocabulary, n_entries=args.entries,
+                                     n_categories=args.categories, wildcard_ratio=args.wildcard_ratio,
+                                     multiword_ratio=args.multiword_ratio, seed=args.seed)
+        stopwords_file = get_data_path("stopwords.txt")
+
+        tokenizer = TwitterAwareTokenizer()
+        stop_remover = StopWordRemover()
+        stop_remover.build_stoplist(load_stopwords_from_file(stopwords_file))
+        loader = LoadDictionary()
+        dict_data = loader.load_dictionary_file(DictionaryData(), dict_file, "utf-8", ",", '"')
+        clean_tokens = [stop_remover.clear_stopwords(tokenizer.tokenize(text)) for text in texts]
+        n_tokens = sum(len(tokens) for tokens in clean_tokens)
+        df = pd.DataFrame({"text": texts})
+
+        def end_to_end():
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                run_vocabulate_analysis(dict_file=dict_file, input_data=df, text_column="text",
+                                        stopwords_file=stopwords_file)
+
+        benchmarks = {
+            "tokenize": (lambda: [tokenizer.tokenize(text) for text in texts], len(texts)),
+            "load_dictionary_file": (lambda: loader.load_dictionary_file(DictionaryData(), dict_file, "utf-8", ",", '"'), 1),
+            "match_dictionary": (lambda: [match_dictionary(dict_data, tokens) for tokens in clean_tokens], len(texts)),
+            "run_vocabulate_analysis": (end_to_end, len(texts)),
+        }
+
+        print(f"hot loops: {'compiled' if speedups.COMPILED else 'pure Python'}")
+        results = {}
+        for name, (func, n_items) in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            seconds, peak = measure(func, args.repeat)
+            results[name] = {"seconds": seconds, "items_per_sec": n_items / seconds if seconds else float("inf"),
+                             "peak_mb": peak / 2**20}
+            print(f"{name:<26} {seconds * 1000:10.1f} ms {results[name]['items_per_sec']:14,.0f} /s "
+                  f"{results[name]['peak_mb']:10.1f} MB peak")
+
+        return {
+            "version": __version__,
+            "python": platform.python_version(),
+            "compiled": speedups.COMPILED,
+            "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "tolerance", "only")},
+            "tokens": n_tokens,
+            "results": results,
+        }
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """Print throughput changes against ``baseline``; return False if any benchmark regressed."""
+    if current["params"] != baseline.get("params"):
+        print("warning: baseline was recorded with different parameters")
+    ok = True
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["items_per_sec"]
+        change = result["items_per_sec"] / before - 1
+        regressed = change < -tolerance
+        ok = ok and not regressed
+        print(f"{name:<26} {change:+8.1%} {'REGRESSION' if regressed else ''}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000, help="number of texts in the corpus")
+    parser.add_argument("--words", type=int, default=30, help="mean words per text")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="distinct words in the corpus")
+    parser.add_argument("--entries", type=int, default=1000, help="dictionary entries")
+    parser.add_argument("--categories", type=int, default=10, help="dictionary categories")
+    parser.add_argument("--wildcard-ratio", type=float, default=0.5, help="share of entries ending in *")
+    parser.add_argument("--multiword-ratio", type=float, default=0.1, help="share of multi-word entries")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed throughput drop before --compare fails (default 0.10)")
+    args = parser.parse_args()
+
+    current = run(args)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(current, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
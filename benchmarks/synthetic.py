@@ -0,0 +1,51 @@
+"""
+Synthetic dictionaries and corpora for benchmarking LEMO Vocabulate
+"""
+import csv
+import random
+import string
+from typing import List, Tuple
+
+EXTRAS = [":)", ":-(", "<3", "@someone", "#tagged", "http://example.com/page", "...", "sooooo", "!!!!", "and/or"]
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(2, 10))))
+    return sorted(words)
+
+def write_dictionary(path: str, vocabulary: List[str], n_entries: int = 1000, n_categories: int = 10,
+                     wildcard_ratio: float = 0.5, multiword_ratio: float = 0.1, seed: int = 0) -> str:
+    """Write a Vocabulate-format dictionary CSV with the given size and wildcard/multi-word mix."""
+    rnd = random.Random(seed)
+    header = ["Concepts"] + [f"Cat{i}" for i in range(n_categories)]
+    seen = set()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        while len(seen) < n_entries:
+            n_words = rnd.randint(2, 4) if rnd.random() < multiword_ratio else 1
+            words = [rnd.choice(vocabulary) for _ in range(n_words)]
+            if rnd.random() < wildcard_ratio:
+                words[-1] = words[-1][:max(2, len(words[-1]) - 3)] + "*"
+            entry = " ".join(words)
+            if entry in seen:
+                continue
+            seen.add(entry)
+            categories = ["X" if rnd.random() < 0.2 else "" for _ in range(n_categories)]
+            writer.writerow([entry] + categories)
+    return path
+
+def make_corpus(vocabulary: List[str], n_texts: int = 1000, mean_words: int = 30,
+                seed: int = 0) -> List[Tuple[str, str]]:
+    """(id, text) pairs of social-media-like text drawn from ``vocabulary``."""
+    rnd = random.Random(seed)
+    pool = vocabulary + EXTRAS + ["the", "and", "i", "you", "is"] * 20
+    corpus = []
+    for i in range(n_texts):
+        n_words = max(1, int(rnd.expovariate(1 / mean_words)))
+        words = [rnd.choice(pool) for _ in range(n_words)]
+        words = [w.capitalize() if rnd.random() < 0.1 else w for w in words]
+        corpus.append((str(i), " ".join(words)))
+    return corpus
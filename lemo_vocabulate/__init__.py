@@ -2,9 +2,35 @@
 LEMO Vocabulate - Dictionary-based text analysis tool using Python.
 """
 
-from .core import run_vocabulate_analysis
+from importlib import import_module
 from pathlib import Path
 
+# Public names are imported on first use, so e.g. ``from lemo_vocabulate.tokenizer import
+# TwitterAwareTokenizer`` or the command line tool do not pay for importing pandas
+_LAZY_ATTRIBUTES = {
+    'run_vocabulate_analysis': '.core',
+    'iter_vocabulate': '.core',
+    'iter_texts': '.core',
+    'write_vocabulate': '.core',
+    'vocabulate_frame': '.core',
+    'VocabulateAnalyzer': '.analyzer',
+    'DictionaryRegistry': '.registry',
+    'AnalysisStats': '.profiling',
+    'ResultCache': '.dedup',
+    'run_sharded': '.sharding',
+}
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
+
 def get_data_path(filename):
     """
     Get the full path to a data file included with the package.
@@ -37,4 +63,5 @@ def get_data_path(filename):
     return str(data_path)
 
 __version__ = "1.0.2" # update version number as needed
-__all__ = ['run_vocabulate_analysis', 'get_data_path']
\ No newline at end of file
+__all__ = ['run_vocabulate_analysis', 'iter_vocabulate', 'iter_texts', 'write_vocabulate', 'vocabulate_frame',
+           'VocabulateAnalyzer', 'DictionaryRegistry', 'AnalysisStats', 'ResultCache', 'run_sharded', 'get_data_path']
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Allows ``python -m lemo_vocabulate``
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,201 @@
+# cython: infer_types=True
+"""
+Hot loops of tokenization and dictionary matching, as plain functions
+
+This module is valid Python and is used as is, but it is also written to be
+compiled with Cython (see setup.py): it only takes builtin containers and
+avoids dynamic features, so the compiled loops run without interpreter
+overhead. ``speedups`` picks the compiled build when one is installed.
+"""
+from typing import AbstractSet, Callable, Dict, List, Optional, Tuple
+
+CAPTURE_NONE = 0
+CAPTURE_TEXT = 1
+CAPTURE_OFFSETS = 2
+
+def match_tokens(standards_root: dict, wildcard_index: dict, max_words: int, words: List[str],
+                 capture: int) -> Tuple[Dict[str, int], int, list, List[str]]:
+    """
+    The matching loop of ``dictionary.match_dictionary``.
+
+    Returns concept counts, the number of matched tokens, the captured
+    matches (joined strings or (start, end) spans, per ``capture``) and the
+    unmatched tokens.
+    """
+    concept_counts: Dict[str, int] = {}
+    captured: list = []
+    nonmatched: List[str] = []
+    _, num_matched_tokens = match_span(standards_root, wildcard_index, max_words, words, 0, len(words), capture,
+                                       concept_counts, captured, nonmatched)
+    return concept_counts, num_matched_tokens, captured, nonmatched
+
+def match_span(standards_root: dict, wildcard_index: dict, max_words: int, words: List[str], start: int, stop: int,
+               capture: int, concept_counts: Dict[str, int], captured: list, nonmatched: List[str]) -> Tuple[int, int]:
+    """
+    ``match_tokens`` for the matches starting in ``words[start:stop]``, accumulating into the given containers.
+
+    A match may run past ``stop`` to the end of ``words``. Returns the position
+    after the last match (``stop`` or up to ``max_words - 1`` beyond it) and
+    the number of matched tokens.
+    """
+    num_matched_tokens = 0
+    num_words = len(words)
+    i = start
+
+    while i < stop:
+        # Longest standard entry starting at i
+        match_len = 0
+        concept = None
+        node = standards_root
+        end = min(num_words, i + max_words)
+        j = i
+        while j < end:
+            node = node.get(words[j])
+            if node is None:
+                break
+            j += 1
+            if None in node:
+                match_len = j - i
+                concept = node[None]
+
+        # Wildcards only need checking for lengths the standards did not already beat
+        n = min(max_words, num_words - i)
+        while n > match_len:
+            index = wildcard_index.get(n)
+            if index is not None:
+                if n == 1:
+                    wildcard_concept = wildcard_lookup_token(index, words[i])
+                else:
+                    wildcard_concept = wildcard_lookup(index, words, i, n)
+                if wildcard_concept is not None:
+                    match_len = n
+                    concept = wildcard_concept
+                    break
+            n -= 1
+
+        if match_len:
+            concept_counts[concept] = concept_counts.get(concept, 0) + 1
+            num_matched_tokens += match_len
+            if capture == CAPTURE_TEXT:
+                captured.append(words[i] if match_len == 1 else ' '.join(words[i:i + match_len]))
+            elif capture == CAPTURE_OFFSETS:
+                captured.append((i, i + match_len))
+            i += match_len
+        else:
+            nonmatched.append(words[i])
+            i += 1
+    return i, num_matched_tokens
+
+# ---------- dictionary.WildcardIndex ----------
+def wildcard_lookup(index, words: List[str], start: int, n: int) -> Optional[str]:
+    """``WildcardIndex.lookup``: the concept of the first wildcard matching ``words[start:start+n]``, or None."""
+    node, hits = walk_token(index, words[start])
+    if n > 1 and node is not None:
+        hits = list(hits)
+        k = start + 1
+        while k < start + n:
+            node = node.get(' ')
+            if node is None:
+                break
+            if None in node:
+                hits.append(node[None])
+            for ch in words[k]:
+                node = node.get(ch)
+                if node is None:
+                    break
+                if None in node:
+                    hits.append(node[None])
+            if node is None:
+                break
+            k += 1
+    if not hits:
+        return None
+
+    best_order = -1
+    best_concept = None
+    candidates: list = []
+    for order, concept, others in hits:
+        if order is not None and (best_order < 0 or order < best_order):
+            best_order = order
+            best_concept = concept
+        if others:
+            candidates.extend(others)
+    if candidates:
+        target = ' '.join(words[start:start + n])
+        candidates.sort(key=_first)
+        for order, pattern, concept in candidates:
+            if best_order >= 0 and order > best_order:
+                break
+            if pattern.match(target):
+                return concept
+    return best_concept
+
+def _first(candidate: tuple):
+    return candidate[0]
+
+def walk_token(index, token: str) -> tuple:
+    """``WildcardIndex._walk_token``: the node reached by walking ``token`` (None if it leaves the trie) and the entries passed."""
+    walks: dict = index._walks
+    walk = walks.get(token)
+    if walk is not None:
+        return walk
+    node = index.root
+    hits = []
+    if None in node:
+        hits.append(node[None])
+    for ch in token:
+        node = node.get(ch)
+        if node is None:
+            break
+        if None in node:
+            hits.append(node[None])
+    if len(walks) >= index.MEMO_SIZE:
+        walks.clear()
+    walk = walks[token] = (node, tuple(hits))
+    return walk
+
+def wildcard_lookup_token(index, token: str) -> Optional[str]:
+    """``WildcardIndex.lookup_token``: memoized lookup of a single token."""
+    memo: dict = index._memo
+    concept = memo.get(token, _MISSING)
+    if concept is not _MISSING:
+        return concept
+    if len(memo) >= index.MEMO_SIZE:
+        memo.clear()
+    concept = memo[token] = wildcard_lookup(index, [token], 0, 1)
+    return concept
+
+_MISSING = object()
+
+# ---------- Tokenization ----------
+def lowercase_tokens(words: List[str], emoticon_match: Callable[[str], Optional[object]]) -> List[str]:
+    """Lowercase tokens, except emoticons (tokens ``emoticon_match`` matches), which keep their case."""
+    result: List[str] = []
+    for word in words:
+        low = word.lower()
+        # Only tokens that lowercasing would change need the emoticon check
+        if low == word or emoticon_match(word) is None:
+            result.append(low)
+        else:
+            result.append(word)
+    return result
+
+def remove_stopwords(words: List[str], stopwords: AbstractSet[str], drop_empty: bool = True) -> List[str]:
+    """Tokens not in ``stopwords``, and also not empty if ``drop_empty``."""
+    result: List[str] = []
+    for word in words:
+        if word not in stopwords and (word or not drop_empty):
+            result.append(word)
+    return result
+
+def count_split_words(text: str) -> int:
+    """The 'new' whitespace word count: tokens split on '/' unless they look like URLs or paths with a '.'."""
+    count = 0
+    for token in text.split():
+        if '/' not in token or '.' in token or token.startswith('http://') or token.startswith('https://'):
+            count += 1
+        else:
+            for part in token.split('/'):
+                if part:
+                    count += 1
+    return count
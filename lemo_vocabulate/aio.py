@@ -0,0 +1,102 @@
+"""
+asyncio micro-batching for scoring from async services
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent coroutines into batches and runs
+    ``func`` on each batch in an executor, off the event loop.
+
+    A batch is dispatched once ``max_batch_size`` items are waiting or
+    ``max_delay`` seconds after its first item arrived, whichever comes
+    first. Batches run one at a time, so ``func`` never runs concurrently
+    with itself. At most ``max_pending`` items wait in the queue; further
+    submissions block until there is room, which slows producers down
+    instead of letting the backlog grow without bound.
+
+    Parameters:
+    -----------
+    func : callable
+        Takes a list of items and returns a list of results in the same order.
+    executor : concurrent.futures.Executor, optional
+        Where ``func`` runs; the event loop's default thread pool if None.
+    max_batch_size, max_delay, max_pending :
+        Batching and backpressure limits as described above.
+    """
+
+    def __init__(self, func: Callable[[List[Any]], List[Any]], executor: Optional[Executor] = None,
+                 max_batch_size: int = 256, max_delay: float = 0.002, max_pending: int = 4096):
+        if max_batch_size < 1 or max_pending < 1:
+            raise ValueError("max_batch_size and max_pending must be at least 1.")
+        self.func = func
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _start(self):
+        # Queues and tasks belong to one event loop; start afresh if called from another
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = loop.create_task(self._run())
+
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """Queue ``items`` and wait for their results, in order."""
+        self._start()
+        futures = []
+        for item in items:
+            future = self._loop.create_future()
+            await self._queue.put((item, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def submit(self, item: Any) -> Any:
+        return (await self.submit_many([item]))[0]
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            if queue.qsize() < self.max_batch_size - 1 and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            # Callers that were cancelled while waiting no longer need a result
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await self._loop.run_in_executor(self.executor, self.func, [item for item, _ in batch])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def aclose(self):
+        """Stop dispatching; results still queued are cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
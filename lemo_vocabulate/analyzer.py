@@ -0,0 +1,211 @@
+"""
+Reusable analyzer that keeps the tokenizer, stoplist and dictionary warm between calls
+"""
+from concurrent.futures import Executor
+from time import perf_counter
+from typing import Iterable, List, Optional
+import numpy as np
+
+from .aio import MicroBatcher
+from .scoring import _prepare, _prepare_text, _result_schema, _analyze_text, _relabel, _ResultColumns
+from .dedup import ResultCache
+from .dictionary import DictionaryData
+from .profiling import AnalysisStats
+from .registry import DictionaryRegistry
+
+class VocabulateAnalyzer:
+    """
+    Long-lived scorer for low-latency use.
+
+    Everything ``run_vocabulate_analysis`` builds per call is built once here,
+    and scoring neither prints nor touches the filesystem. Results are plain
+    dicts with the same columns as ``run_vocabulate_analysis`` output.
+
+    Parameters:
+    -----------
+    dict_file, stopwords_text, stopwords_file, raw_counts, encoding,
+    csv_delimiter, csv_quote, whitespace_method, cache_dir :
+        As for ``run_vocabulate_analysis``. ``dict_file`` may also be a
+        ``DictionaryRegistry``, in which case each batch is scored with the
+        registry's current dictionary version, results gain a ``DictVersion``
+        column after ``Filename``, and the registry's own loading options
+        apply instead of ``raw_counts``, ``csv_delimiter``, ``csv_quote`` and
+        ``cache_dir``.
+    text_output : str
+        Defaults to "none", so results carry numeric metrics only.
+    stats : AnalysisStats, optional
+        Records dictionary load time and per-stage timings for every text scored.
+    result_cache : ResultCache, optional
+        Returns the result of an identical earlier text instead of scoring it again.
+    executor : concurrent.futures.Executor, optional
+        Thread pool the async methods score in; the event loop's default
+        executor if None.
+    max_batch_size, max_batch_delay, max_pending :
+        Texts from concurrent ``ascore``/``ascore_batch`` calls are scored
+        together in batches of up to ``max_batch_size``, waiting at most
+        ``max_batch_delay`` seconds for a batch to fill; callers wait for
+        room once ``max_pending`` texts are queued. See ``aio.MicroBatcher``.
+
+    Examples:
+    ---------
+    >>> analyzer = VocabulateAnalyzer(get_data_path("AEV_Dict.csv"),
+    ...                               stopwords_file=get_data_path("stopwords.txt"))
+    >>> analyzer.score("I am so angry and agitated!")["Neg_CWR"]
+    33.33333
+    >>> rows = await analyzer.ascore_batch(["so angry", "so happy"])
+    """
+
+    def __init__(self, dict_file, stopwords_text: str = None, stopwords_file: str = None,
+                 raw_counts: bool = True, encoding: str = "utf-8", csv_delimiter: str = ",",
+                 csv_quote: str = '"', whitespace_method: str = 'new', text_output: str = "none",
+                 truncate_chars: int = 200, cache_dir: Optional[str] = None,
+                 stats: Optional[AnalysisStats] = None, result_cache: Optional[ResultCache] = None,
+                 executor: Optional[Executor] = None, max_batch_size: int = 256, max_batch_delay: float = 0.002,
+                 max_pending: int = 4096):
+        self.stats = stats
+        self.text_output = text_output
+        if isinstance(dict_file, DictionaryRegistry):
+            self.registry: Optional[DictionaryRegistry] = dict_file
+            self.tokenizer, self.stop_remover, stopwords_text = _prepare_text(stopwords_text, stopwords_file,
+                                                                              encoding)
+            self._layout: Optional[_Layout] = None
+        else:
+            self.registry = None
+            self.tokenizer, self.stop_remover, dict_data, stopwords_text = _prepare(
+                dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter, csv_quote,
+                cache_dir, stats)
+            self._layout = _Layout(dict_data, text_output)
+        self.result_cache = result_cache
+        if result_cache is not None:
+            result_cache.bind((dict_file, stopwords_text, raw_counts, encoding, csv_delimiter, csv_quote,
+                               whitespace_method, text_output, truncate_chars))
+        self.whitespace_method = whitespace_method
+        self.truncate_chars = truncate_chars
+        self._batcher = MicroBatcher(self._score_items, executor, max_batch_size, max_batch_delay, max_pending)
+
+    @property
+    def dict_data(self):
+        return self._current_layout().dict_data
+
+    @property
+    def schema(self) -> dict:
+        return self._current_layout().schema
+
+    @property
+    def columns(self) -> List[str]:
+        return self._current_layout().columns
+
+    def _current_layout(self) -> "_Layout":
+        """The layout of the dictionary version to score the next batch with."""
+        if self.registry is None:
+            return self._layout
+        snapshot = self.registry.current
+        layout = self._layout
+        if layout is None or layout.version != snapshot.version:
+            layout = self._layout = _Layout(snapshot.dict_data, self.text_output, snapshot.version)
+        return layout
+
+    def _analyze(self, text: str, text_id, layout: "_Layout") -> tuple:
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.key(text)
+            if layout.version is not None:
+                key += layout.version.to_bytes(8, "little")
+            result = cache.get(key)
+            if result is not None:
+                return _relabel(result, text_id)
+        result = _analyze_text(text, text_id, self.tokenizer, self.stop_remover, layout.dict_data,
+                               self.whitespace_method, self.text_output, self.truncate_chars, self.stats)
+        if layout.version is not None:
+            row, concept_ids, counts = result
+            result = (row[0], layout.version) + row[1:], concept_ids, counts
+        if cache is not None:
+            cache.put(key, result)
+        return result
+
+    def score(self, text: str, text_id: str = None) -> dict:
+        """Score one text. ``text_id`` is returned in the ``Filename`` field."""
+        layout = self._current_layout()
+        row, concept_ids, counts = self._analyze(text, text_id, layout)
+        started = perf_counter()
+        category_values = _category_values(layout.dict_data, concept_ids, counts, row[layout.wc_index])
+        if self.stats is not None:
+            self.stats.add("aggregate", perf_counter() - started)
+        return dict(zip(layout.columns, list(row) + category_values))
+
+    def score_batch(self, texts: Iterable[str], ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """Score several texts at once, with category metrics computed for the whole batch."""
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        if len(ids) != len(texts):
+            raise ValueError("ids must have the same length as texts.")
+        # The whole batch is scored with one dictionary version, even if a newer one is published meanwhile
+        layout = self._current_layout()
+        columns = _ResultColumns(layout.schema, layout.dict_data, len(texts), self.stats)
+        for text_id, text in zip(ids, texts):
+            columns.append(self._analyze(text, text_id, layout))
+        return columns.to_records()
+
+    def _score_items(self, items: List[tuple]) -> List[dict]:
+        return self.score_batch([text for text, _ in items], [text_id for _, text_id in items])
+
+    # ---------- asyncio ----------
+    async def ascore(self, text: str, text_id: str = None) -> dict:
+        """``score`` for async code: batched with other pending requests and run off the event loop."""
+        return await self._batcher.submit((_check_text(text), text_id))
+
+    async def ascore_batch(self, texts: Iterable[str], ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """``score_batch`` for async code; see ``ascore``."""
+        texts = [_check_text(text) for text in texts]
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        if len(ids) != len(texts):
+            raise ValueError("ids must have the same length as texts.")
+        return await self._batcher.submit_many(list(zip(texts, ids)))
+
+    async def aclose(self):
+        """Stop the async batcher. Texts still waiting are cancelled."""
+        await self._batcher.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+class _Layout:
+    """A dictionary version with the result columns it produces."""
+
+    def __init__(self, dict_data, text_output: str, version: Optional[int] = None):
+        self.dict_data = dict_data
+        self.version = version
+        schema = _result_schema(dict_data, text_output)
+        if version is not None:
+            schema = {"Filename": schema.pop("Filename"), "DictVersion": np.int64, **schema}
+        self.schema = schema
+        self.columns: List[str] = list(schema)
+        self.wc_index = self.columns.index("WC")
+
+def _check_text(text) -> str:
+    # Checked before queueing, so one bad input cannot fail a batch shared with other callers
+    if not isinstance(text, str):
+        raise TypeError(f"texts must be str, got {type(text).__name__}.")
+    return text
+
+def _category_values(dict_data: DictionaryData, concept_ids: List[int], counts: List[int], wc: int) -> list:
+    """Category columns for a single row; the scalar counterpart of ``scoring._category_metrics``."""
+    indptr, indices = dict_data.concept_category_indptr, dict_data.concept_category_indices
+    unique = [0] * dict_data.num_cats
+    total = [0] * dict_data.num_cats
+    for concept_id, count in zip(concept_ids, counts):
+        for k in range(indptr[concept_id], indptr[concept_id + 1]):
+            unique[indices[k]] += 1
+            total[indices[k]] += count
+
+    values = []
+    for i in range(dict_data.num_cats):
+        values.append(round(unique[i] / wc * 100, 5) if wc else 0.0)
+        values.append(round(unique[i] / total[i] * 100, 5) if total[i] else 0.0)
+        if dict_data.raw_word_counts:
+            values.append(total[i])
+            values.append(unique[i])
+    return values
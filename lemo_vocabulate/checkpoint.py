@@ -0,0 +1,173 @@
+"""
+Checkpointed runs: persist finished result chunks and resume after an interruption
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+
+from .dedup import text_digest
+
+MANIFEST_VERSION = 1
+
+def text_fingerprint(text: str) -> str:
+    return text_digest(text).hex()
+
+def file_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+class Checkpoint:
+    """
+    A checkpoint directory for one analysis job.
+
+    Each finished chunk of results is written to its own part file, and a
+    line naming the part and the ids it holds is appended to
+    ``manifest.jsonl``, so a run that is killed loses at most the chunk in
+    progress. Each id is stored with a hash of its text and, for whole-file
+    inputs, the file's modification time and size.
+
+    On resume, texts whose id and hash are already in the manifest are not
+    scored again, and unchanged files are not even read. New or changed
+    texts are scored and stored in new parts, superseding older rows with
+    the same id. If the dictionary, stopwords or scoring options differ
+    from the ones the checkpoint was made with, it is discarded and the run
+    starts over.
+
+    Ids must be unique within a run.
+
+    Parameters:
+    -----------
+    directory : str or Path
+        Created if missing. Use one directory per job.
+    settings : dict
+        JSON-serializable description of everything that affects results.
+    """
+
+    def __init__(self, directory, settings: dict):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / "manifest.jsonl"
+        self.settings = settings
+        self.done: Dict[str, Tuple[str, Optional[str], str]] = {}   # id -> (text hash, file stat, part)
+        self.parts: List[str] = []
+        self._next_part = 0
+        self.restarted = False
+        self.skipped = 0
+        self._order: List[str] = []
+        self._seen = set()
+        self._new: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._file_stats: Dict[str, str] = {}
+        self._load()
+
+    # ---------- Manifest ----------
+    def _load(self):
+        if not self.manifest_path.exists():
+            self._start()
+            return
+        with open(self.manifest_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get("version") != MANIFEST_VERSION or header.get("settings") != self.settings:
+            self._clear()
+            self.restarted = True
+            self._start()
+            return
+        for number, line in enumerate(lines[1:], 1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash: drop it so later appends stay readable; its part is scored again
+                with open(self.manifest_path, "w", encoding="utf-8") as f:
+                    f.write("".join(kept + "\n" for kept in lines[:number]))
+                break
+            self._next_part += 1
+            if not (self.directory / entry["part"]).exists():
+                continue
+            self.parts.append(entry["part"])
+            for item_id, (text_hash, stat) in entry["items"].items():
+                self.done[item_id] = (text_hash, stat, entry["part"])
+
+    def _start(self):
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "settings": self.settings}) + "\n")
+
+    def _clear(self):
+        for part in self.directory.glob("part-*.pkl"):
+            part.unlink()
+        self.manifest_path.unlink()
+
+    # ---------- Filtering input ----------
+    def unchanged_file(self, path: Path, item_id: str) -> bool:
+        """True if ``path`` was scored under ``item_id`` and has not been modified since."""
+        stat = file_fingerprint(path)
+        done = self.done.get(item_id)
+        if done is not None and done[1] == stat:
+            return True
+        self._file_stats[item_id] = stat
+        return False
+
+    def pending(self, items: Iterable[Tuple[str, Optional[str]]],
+                on_skip: Optional[Callable[[], None]] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the (id, text) pairs that still need scoring, recording every id seen.
+
+        A text of None means the reader skipped an unchanged file without
+        reading it.
+        """
+        for item_id, text in items:
+            if item_id in self._seen:
+                raise ValueError(f"Checkpointed runs need unique ids; '{item_id}' appears more than once.")
+            self._seen.add(item_id)
+            self._order.append(item_id)
+            done = self.done.get(item_id)
+            if text is None:
+                self.skipped += 1
+                if on_skip is not None:
+                    on_skip()
+                continue
+            text_hash = text_fingerprint(text)
+            if done is not None and done[0] == text_hash:
+                self.skipped += 1
+                if on_skip is not None:
+                    on_skip()
+                continue
+            self._new[item_id] = (text_hash, self._file_stats.pop(item_id, None))
+            yield item_id, text
+
+    # ---------- Results ----------
+    def save(self, frame: pd.DataFrame):
+        """Persist a chunk of newly scored results and record it in the manifest."""
+        # A part file left by a crash before its manifest line was written is overwritten
+        part = f"part-{self._next_part:06d}.pkl"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        frame.to_pickle(tmp_path)
+        os.replace(tmp_path, self.directory / part)
+
+        items = {item_id: self._new.pop(item_id) for item_id in frame["Filename"]}
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"part": part, "items": items}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.parts.append(part)
+        self._next_part += 1
+        for item_id, (text_hash, stat) in items.items():
+            self.done[item_id] = (text_hash, stat, part)
+
+    def results(self, columns: List[str]) -> pd.DataFrame:
+        """Current results for every id seen in this run, in input order."""
+        wanted: Dict[str, set] = {}
+        for item_id in self._order:
+            wanted.setdefault(self.done[item_id][2], set()).add(item_id)
+        frames = []
+        for part in self.parts:
+            if part in wanted:
+                frame = pd.read_pickle(self.directory / part)
+                frames.append(frame[frame["Filename"].isin(wanted.pop(part))])
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return df.set_index("Filename").loc[self._order].reset_index()[columns]
@@ -0,0 +1,131 @@
+"""
+Command line interface: ``lemo-vocabulate``
+
+Scores texts from files, folders or stdin and streams one result row per
+text to stdout. Only the pandas-free scoring modules are imported, so short
+per-file invocations in shell pipelines start quickly; pandas is loaded only
+when writing Parquet/Feather/CSV files with ``--output``.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .ingest import _batched, read_json_lines, read_path
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="lemo-vocabulate",
+        description="Score texts against Vocabulate dictionaries. Reads the given files/folders "
+                    "(.txt, .jsonl, optionally .gz/.zst), or stdin if none are given, and writes "
+                    "one result row per text to stdout.")
+    parser.add_argument("inputs", nargs="*", metavar="PATH",
+                        help="Files or folders to score; '-' or nothing reads stdin.")
+    parser.add_argument("-d", "--dict", dest="dicts", action="append", required=True, metavar="[NAME=]PATH",
+                        help="Dictionary CSV. Repeat to score several at once; columns are prefixed with "
+                             "NAME (default: the file name without extension).")
+    parser.add_argument("-s", "--stopwords", metavar="PATH",
+                        help="Stopwords file (default: the bundled stopwords.txt).")
+    parser.add_argument("--stdin-format", choices=("lines", "jsonl"), default="lines",
+                        help="stdin holds one text per line, or JSON Lines records (default: lines).")
+    parser.add_argument("--text-field", default="text", help="JSON Lines key holding the text (default: text).")
+    parser.add_argument("--id-field", help="JSON Lines key holding the id (default: <source>:<line number>).")
+    parser.add_argument("-f", "--format", choices=("jsonl", "csv", "tsv"), default="jsonl",
+                        help="Format written to stdout (default: jsonl).")
+    parser.add_argument("-o", "--output", metavar="PATH",
+                        help="Write a .parquet, .feather or .csv file instead of stdout (imports pandas).")
+    parser.add_argument("--text-output", choices=("none", "full", "truncate", "offsets"), default="none",
+                        help="How the text and CapturedText columns are emitted (default: none).")
+    parser.add_argument("--truncate-chars", type=int, default=200)
+    parser.add_argument("--no-raw-counts", dest="raw_counts", action="store_false",
+                        help="Omit the per-category _Count and _Unique columns.")
+    parser.add_argument("--whitespace-method", choices=("new", "old"), default="new")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding of input files and dictionaries.")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search folders recursively.")
+    parser.add_argument("--cache-dir", help="Directory for compiled dictionary caches.")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="Texts scored (and flushed to stdout) together (default: 256).")
+    return parser
+
+def _dictionaries(specs: List[str]):
+    """The ``dict_file`` argument for one or several -d options."""
+    if len(specs) == 1 and "=" not in specs[0]:
+        return specs[0]
+    if not any("=" in spec for spec in specs):
+        return specs
+    named = {}
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        if name in named:
+            raise ValueError(f"Dictionary name '{name}' is used more than once.")
+        named[name] = path
+    return named
+
+def _stdin_texts(stdin_format: str, text_field: str, id_field: Optional[str]) -> Iterator[Tuple[str, str]]:
+    if stdin_format == "jsonl":
+        return read_json_lines(sys.stdin, "stdin", text_field, id_field)
+    return ((str(number), line.rstrip("\r\n")) for number, line in enumerate(sys.stdin, 1))
+
+def _texts(args) -> Iterator[Tuple[str, str]]:
+    # Every path is validated here, before scoring starts
+    readers = [None if path == "-" else read_path(path, args.recursive, encoding=args.encoding,
+                                                    text_field=args.text_field, id_field=args.id_field)
+               for path in args.inputs or ["-"]]
+    return chain.from_iterable(_stdin_texts(args.stdin_format, args.text_field, args.id_field)
+                               if reader is None else reader for reader in readers)
+
+def _write_stream(analyzer, texts: Iterable[Tuple[str, str]], out_format: str, batch_size: int):
+    out = sys.stdout
+    if out_format == "jsonl":
+        for batch in _batched(texts, batch_size):
+            rows = analyzer.score_batch([text for _, text in batch], [text_id for text_id, _ in batch])
+            out.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+            out.flush()
+        return
+    writer = csv.writer(out, delimiter="\t" if out_format == "tsv" else ",", lineterminator="\n")
+    writer.writerow(analyzer.columns)
+    for batch in _batched(texts, batch_size):
+        rows = analyzer.score_batch([text for _, text in batch], [text_id for text_id, _ in batch])
+        writer.writerows(row.values() for row in rows)
+        out.flush()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1.")
+    stopwords_file = args.stopwords
+    if stopwords_file is None:
+        from . import get_data_path
+        stopwords_file = get_data_path("stopwords.txt")
+
+    options = dict(dict_file=None, stopwords_file=stopwords_file, raw_counts=args.raw_counts,
+                   encoding=args.encoding, whitespace_method=args.whitespace_method,
+                   text_output=args.text_output, truncate_chars=args.truncate_chars, cache_dir=args.cache_dir)
+    try:
+        options["dict_file"] = _dictionaries(args.dicts)
+        texts = _texts(args)
+        if args.output is not None:
+            from .core import write_vocabulate
+            write_vocabulate(texts, args.output, **options)
+        else:
+            from .analyzer import VocabulateAnalyzer
+            _write_stream(VocabulateAnalyzer(**options), texts, args.format, args.batch_size)
+    except (ValueError, FileNotFoundError, UnicodeDecodeError, RuntimeError) as e:
+        parser.exit(1, f"{parser.prog}: error: {e}\n")
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head): stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
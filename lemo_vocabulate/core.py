@@ -1,14 +1,396 @@
 """
 Core analysis functions for LEMO Vocabulate
 """
+import copy
+import os
+import warnings
+from itertools import repeat
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from .tokenizer import TwitterAwareTokenizer, tokenize_whitespace
-from .stopwords import StopWordRemover, load_stopwords_from_file
-from .dictionary import DictionaryData, LoadDictionary, match_dictionary
+from .tokenizer import TwitterAwareTokenizer
+from .stopwords import StopWordRemover
+from .dictionary import DictionaryData, dictionary_cache_key
+from .profiling import AnalysisStats
+from .ingest import DocumentReader, _batched, read_path
+from .dedup import ResultCache
+from .checkpoint import Checkpoint, text_fingerprint
+from .writers import CSVWriter, ResultWriter, writer_class
+from .scoring import (_load_dictionary, _named_dictionaries, _prepare, _result_schema, _analyze_text, _relabel,
+                      _ResultColumns)
+
+# ------------------- Multiprocessing -------------------
+# Per-process state, built once by _init_worker so each worker parses the
+# dictionary and stoplist a single time rather than once per text.
+_worker_state = {}
+
+def _init_worker(dict_file, stopwords_text, raw_counts, encoding, csv_delimiter, csv_quote, whitespace_method,
+                 text_output, truncate_chars, cache_dir, profile):
+    stop_remover = StopWordRemover()
+    stop_remover.build_stoplist(stopwords_text)
+    _worker_state["tokenizer"] = TwitterAwareTokenizer()
+    _worker_state["stop_remover"] = stop_remover
+    _worker_state["dict_data"] = _load_dictionary(dict_file, encoding, csv_delimiter, csv_quote, raw_counts,
+                                                  cache_dir)
+    _worker_state["whitespace_method"] = whitespace_method
+    _worker_state["text_output"] = text_output
+    _worker_state["truncate_chars"] = truncate_chars
+    _worker_state["profile"] = profile
+
+def _analyze_in_worker(item):
+    filename, text = item
+    # When profiling, each result travels with the timings recorded for it
+    stats = AnalysisStats() if _worker_state["profile"] else None
+    result = _analyze_text(text, filename, _worker_state["tokenizer"], _worker_state["stop_remover"],
+                           _worker_state["dict_data"], _worker_state["whitespace_method"],
+                           _worker_state["text_output"], _worker_state["truncate_chars"], stats)
+    return result if stats is None else (result, stats)
+
+def _resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+def _iter_rows(items: Iterable[Tuple[str, str]], tokenizer, stop_remover, dict_data, whitespace_method,
+               text_output: str, truncate_chars: int, n_jobs: int, chunksize: Optional[int],
+               init_args: tuple, stats: Optional[AnalysisStats] = None,
+               cache: Optional[ResultCache] = None) -> Iterator[tuple]:
+    """Yield one ``_analyze_text`` result per (id, text) pair, in input order."""
+    if cache is not None:
+        # Everything but cache_dir and profile affects the scored rows
+        cache.bind(init_args[:-2])
+
+    if n_jobs <= 1:
+        for filename, text in items:
+            if cache is not None:
+                key = cache.key(text)
+                result = cache.get(key)
+                if result is not None:
+                    yield _relabel(result, filename)
+                    continue
+            result = _analyze_text(text, filename, tokenizer, stop_remover, dict_data, whitespace_method,
+                                   text_output, truncate_chars, stats)
+            if cache is not None:
+                cache.put(key, result)
+            yield result
+        return
+
+    chunksize = chunksize or 1000
+    with Pool(processes=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+        # Pool.imap drains its whole input up front, so feed it bounded batches
+        # to keep memory flat when items is a lazy stream. imap keeps input
+        # order, so rows come back exactly as in a serial run.
+        for batch in _batched(items, chunksize * n_jobs * 4):
+            if cache is None:
+                for result in pool.imap(_analyze_in_worker, batch, chunksize=chunksize):
+                    yield _merge_worker_stats(result, stats)
+                continue
+            # Only texts not already cached are sent to the workers
+            keys, found, todo = _dedup_batch(batch, cache)
+            computed = pool.imap(_analyze_in_worker, todo, chunksize=chunksize)
+            for key, (filename, _) in zip(keys, batch):
+                result = found[key]
+                if result is None:
+                    result = found[key] = _merge_worker_stats(next(computed), stats)
+                    cache.put(key, result)
+                yield _relabel(result, filename)
+
+def _merge_worker_stats(result, stats: Optional[AnalysisStats]) -> tuple:
+    if stats is None:
+        return result
+    result, worker_stats = result
+    stats.merge(worker_stats)
+    return result
+
+def _dedup_batch(batch: List[Tuple[str, str]], cache: ResultCache):
+    """Content keys for a batch, the cached result per key (None if not cached), and the texts left to score."""
+    keys = [cache.key(text) for _, text in batch]
+    found = {}
+    todo = []
+    for key, item in zip(keys, batch):
+        if key in found:
+            # Repeated within the batch: scored once, reused for the rest
+            cache.hits += 1
+            continue
+        found[key] = cache.get(key)
+        if found[key] is None:
+            todo.append(item)
+    return keys, found, todo
+
+def iter_texts(input_data, text_column: str = None, encoding: str = "utf-8", recursive: bool = False,
+               read_threads: int = 8, prefetch: int = 64, text_field: str = "text",
+               id_field: Optional[str] = None,
+               skip_file: Optional[Callable[[Path, str], bool]] = None) -> Iterable[Tuple[str, str]]:
+    """
+    Lazily yield (id, text) pairs from a DataFrame, a file, or a folder of files.
+
+    Files may be .txt (one document each) or .jsonl (one document per line,
+    read from ``text_field`` and optionally ``id_field``), either optionally
+    compressed as .gz or .zst. Folders are searched recursively if
+    ``recursive``, in which case ids are paths relative to the folder.
+    Files are read by ``read_threads`` threads up to ``prefetch`` files
+    ahead, so reading overlaps with analysis; see ``ingest.DocumentReader``.
+
+    An ``ingest.DocumentReader`` over an explicit list of files (as built
+    for each shard by ``sharding.run_sharded``) is used as is.
+
+    Input is validated immediately; file contents are only read as the
+    iterator is consumed. ``skip_file`` is passed on to ``DocumentReader``.
+    """
+    if isinstance(input_data, pd.DataFrame):
+        if text_column is None:
+            raise ValueError("text_column must be specified for DataFrame input.")
+        if text_column not in input_data.columns:
+            raise ValueError(f"Column '{text_column}' not found in input_data DataFrame.")
+        return zip(input_data.index.astype(str), _column_texts(input_data[text_column]))
+
+    if isinstance(input_data, DocumentReader):
+        if skip_file is None:
+            return input_data
+        reader = copy.copy(input_data)
+        reader.skip_file = skip_file
+        return reader
+
+    if isinstance(input_data, (str, Path)):
+        return read_path(input_data, recursive, encoding=encoding, read_threads=read_threads, prefetch=prefetch,
+                         text_field=text_field, id_field=id_field, skip_file=skip_file)
+
+    raise ValueError("input_data must be a DataFrame, file path, folder path, or DocumentReader.")
+
+def _column_texts(column: pd.Series) -> Iterator[str]:
+    """Texts of a column with missing values as "", converted one at a time rather than copied up front."""
+    missing = column.isna().to_numpy()
+    for value, is_missing in zip(column.to_numpy(), missing):
+        yield "" if is_missing else value if type(value) is str else str(value)
+
+def iter_vocabulate(
+    texts: Iterable[Tuple[str, str]],
+    dict_file: str = None,
+    stopwords_text: str = None,
+    stopwords_file: str = None,
+    raw_counts: bool = True,
+    encoding: str = "utf-8",
+    csv_delimiter: str = ",",
+    csv_quote: str = '"',
+    whitespace_method: str = 'new',
+    chunk_size: Optional[int] = None,
+    n_jobs: int = 1,
+    text_output: str = "full",
+    truncate_chars: int = 200,
+    cache_dir: Optional[str] = None,
+    stats: Optional[AnalysisStats] = None,
+    result_cache: Optional[ResultCache] = None
+) -> Iterator[Union[dict, pd.DataFrame]]:
+    """
+    Score a stream of texts without holding the corpus or its results in memory.
+
+    Parameters:
+    -----------
+    texts : iterable of (id, text) pairs
+        Any iterable, e.g. a generator reading from disk or ``iter_texts(...)``.
+    chunk_size : int, optional
+        If None, yield one result dict per text. Otherwise yield DataFrames of
+        up to ``chunk_size`` rows with a fixed column schema.
+    n_jobs : int
+        Worker processes to score with (-1 uses every core).
+    text_output : str
+        How the ``text`` and ``CapturedText`` columns are emitted: "full"
+        (default), "truncate" (first ``truncate_chars`` characters), "offsets"
+        (drop ``text`` and replace ``CapturedText`` with ``CapturedOffsets``,
+        space-separated ``start:end`` spans into the cleaned token stream),
+        or "none" (drop both).
+    cache_dir : str, optional
+        Directory for compiled dictionary caches. When set, the dictionary is
+        compiled once per file version and loaded from the cache afterwards,
+        including by worker processes.
+    stats : AnalysisStats, optional
+        Records per-stage timings, dictionary load time and throughput.
+    result_cache : ResultCache, optional
+        Reuses the result of an identical earlier text instead of scoring
+        it again; see ``dedup.ResultCache``.
+
+    The remaining parameters match ``run_vocabulate_analysis``.
+
+    Examples:
+    ---------
+    >>> for chunk in iter_vocabulate(iter_texts("texts/"), dict_file=get_data_path("AEV_Dict.csv"),
+    ...                              stopwords_file=get_data_path("stopwords.txt"), chunk_size=10000):
+    ...     chunk.to_csv("out.csv", mode="a", index=False)
+    """
+    # Category metrics are computed per batch, so row dicts are produced in small batches too
+    _, blocks = _score_blocks(texts, dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter,
+                              csv_quote, whitespace_method, chunk_size or 256, n_jobs, text_output, truncate_chars,
+                              cache_dir, stats, result_cache)
+    for columns in blocks:
+        if chunk_size is not None:
+            yield columns.to_frame()
+        else:
+            yield from columns.to_records()
+
+def _score_blocks(texts, dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter, csv_quote,
+                  whitespace_method, block_size, n_jobs, text_output, truncate_chars, cache_dir,
+                  stats: Optional[AnalysisStats] = None,
+                  result_cache: Optional[ResultCache] = None) -> Tuple[dict, Iterator[_ResultColumns]]:
+    """
+    Validate arguments and load the dictionary now, then return the result
+    schema and a lazy iterator of ``_ResultColumns`` blocks of up to
+    ``block_size`` rows.
+    """
+    tokenizer, stop_remover, dict_data, stopwords_text = _prepare(
+        dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter, csv_quote, cache_dir, stats)
+    schema = _result_schema(dict_data, text_output)
+    init_args = (dict_file, stopwords_text, raw_counts, encoding, csv_delimiter, csv_quote, whitespace_method,
+                 text_output, truncate_chars, cache_dir, stats is not None)
+    rows = _iter_rows(texts, tokenizer, stop_remover, dict_data, whitespace_method, text_output, truncate_chars,
+                      _resolve_n_jobs(n_jobs), None, init_args, stats, result_cache)
+    return schema, _fill_blocks(rows, schema, dict_data, block_size, stats)
+
+def _fill_blocks(rows: Iterable[tuple], schema: dict, dict_data: DictionaryData, block_size: int,
+                 stats: Optional[AnalysisStats] = None) -> Iterator[_ResultColumns]:
+    """Collect scored rows into ``_ResultColumns`` of up to ``block_size`` rows each."""
+    if stats is not None:
+        stats.start()
+    try:
+        columns = _ResultColumns(schema, dict_data, block_size, stats)
+        for row in rows:
+            columns.append(row)
+            if columns.size == block_size:
+                yield columns
+                columns = _ResultColumns(schema, dict_data, block_size, stats)
+        if columns.size:
+            yield columns
+    finally:
+        if stats is not None:
+            stats.stop()
+
+def _tick(rows: Iterable[tuple], progress: tqdm) -> Iterator[tuple]:
+    for row in rows:
+        progress.update()
+        yield row
+
+def _open_output(path, schema: dict, format: Optional[str], csv_delimiter: str, csv_quote: str) -> ResultWriter:
+    cls = writer_class(path, format)
+    options = dict(sep=csv_delimiter, quotechar=csv_quote) if issubclass(cls, CSVWriter) else {}
+    return cls(path, schema, **options)
+
+def write_vocabulate(
+    texts: Iterable[Tuple[str, str]],
+    output_path: str,
+    chunk_size: int = 10000,
+    format: Optional[str] = None,
+    dict_file: str = None,
+    stopwords_text: str = None,
+    stopwords_file: str = None,
+    raw_counts: bool = True,
+    encoding: str = "utf-8",
+    csv_delimiter: str = ",",
+    csv_quote: str = '"',
+    whitespace_method: str = 'new',
+    n_jobs: int = 1,
+    text_output: str = "full",
+    truncate_chars: int = 200,
+    cache_dir: Optional[str] = None,
+    stats: Optional[AnalysisStats] = None,
+    result_cache: Optional[ResultCache] = None
+) -> int:
+    """
+    Score a stream of texts and write results to ``output_path`` chunk by chunk.
+
+    The format follows the file suffix: ``.parquet`` (one row group per
+    chunk), ``.feather`` or ``.arrow`` (Arrow IPC, one record batch per
+    chunk), otherwise CSV; Parquet and Feather require pyarrow. ``format``
+    overrides the suffix. Column names and types are fixed up front from the
+    dictionary, so every chunk has the same schema. The remaining parameters
+    match ``iter_vocabulate``. Returns the number of rows written.
+    """
+    schema, blocks = _score_blocks(texts, dict_file, stopwords_text, stopwords_file, raw_counts, encoding,
+                                   csv_delimiter, csv_quote, whitespace_method, chunk_size, n_jobs, text_output,
+                                   truncate_chars, cache_dir, stats, result_cache)
+    with _open_output(output_path, schema, format, csv_delimiter, csv_quote) as writer:
+        for columns in blocks:
+            writer.write(columns.to_columns())
+    return writer.rows
+
+def vocabulate_frame(
+    df: pd.DataFrame,
+    text_column: str,
+    dict_file: str = None,
+    stopwords_text: str = None,
+    stopwords_file: str = None,
+    raw_counts: bool = True,
+    encoding: str = "utf-8",
+    csv_delimiter: str = ",",
+    csv_quote: str = '"',
+    whitespace_method: str = 'new',
+    n_jobs: int = 1,
+    text_output: str = "none",
+    truncate_chars: int = 200,
+    cache_dir: Optional[str] = None,
+    stats: Optional[AnalysisStats] = None,
+    result_cache: Optional[ResultCache] = None,
+    assign: bool = False,
+    prefix: str = ""
+) -> pd.DataFrame:
+    """
+    Score a DataFrame column and return results aligned to the frame's index.
+
+    Unlike ``run_vocabulate_analysis``, the result has no ``Filename`` or
+    ``text`` column and keeps ``df.index``, so it can be used or joined
+    positionally without a merge. Each metric column is a typed NumPy array
+    allocated once for the whole frame and filled block by block as texts
+    are scored.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Input frame; it is not copied.
+    text_column : str
+        Column holding the texts. Missing values score as empty texts.
+    text_output : str
+        Defaults to "none" (metrics only); "full", "truncate" or "offsets"
+        add a ``CapturedText`` or ``CapturedOffsets`` column.
+    assign : bool
+        If True, add the result columns to ``df`` in place and return ``df``.
+        Existing columns with the same names are overwritten.
+    prefix : str
+        Prepended to every result column name, e.g. "aev_".
+
+    The remaining parameters match ``iter_vocabulate``.
+
+    Examples:
+    ---------
+    >>> vocabulate_frame(posts, "body", dict_file=get_data_path("AEV_Dict.csv"),
+    ...                  stopwords_file=get_data_path("stopwords.txt"), assign=True, prefix="aev_")
+    """
+    if text_column not in df.columns:
+        raise ValueError(f"Column '{text_column}' not found in input_data DataFrame.")
+    texts = zip(repeat(None), _column_texts(df[text_column]))
+    schema, blocks = _score_blocks(texts, dict_file, stopwords_text, stopwords_file, raw_counts, encoding,
+                                   csv_delimiter, csv_quote, whitespace_method, 10000, n_jobs, text_output,
+                                   truncate_chars, cache_dir, stats, result_cache)
+    names = [name for name in schema if name not in ("Filename", "text")]
+    results = {name: np.empty(len(df), dtype=schema[name]) for name in names}
+    start = 0
+    for columns in blocks:
+        data = columns.to_columns()
+        for name in names:
+            results[name][start:start + columns.size] = data[name]
+        start += columns.size
+
+    if not assign:
+        return pd.DataFrame({prefix + name: results[name] for name in names}, index=df.index, copy=False)
+    with warnings.catch_warnings():
+        # Adding many columns one by one fragments the frame's blocks; that is the price of not copying it
+        warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+        for name in names:
+            df[prefix + name] = results[name]
+    return df
 
 def run_vocabulate_analysis(
     dict_file: str = None,
@@ -21,125 +403,131 @@ def run_vocabulate_analysis(
     csv_delimiter: str = ",",
     csv_quote: str = '"',
     output_csv: str = None,
-    whitespace_method: str = 'new'  # <- new optional parameter
+    whitespace_method: str = 'new',  # <- new optional parameter
+    n_jobs: int = 1,
+    chunksize: Optional[int] = None,
+    text_output: str = "full",
+    truncate_chars: int = 200,
+    cache_dir: Optional[str] = None,
+    stats: Optional[AnalysisStats] = None,
+    recursive: bool = False,
+    read_threads: int = 8,
+    output_file: str = None,
+    output_format: Optional[str] = None,
+    result_cache: Optional[ResultCache] = None,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_every: int = 10000
 ) -> pd.DataFrame:
-    """Analyze text(s) using a dictionary file, with input validation and error handling."""
+    """Analyze text(s) using a dictionary file, with input validation and error handling.
 
-    if not dict_file:
-        raise ValueError("Error: dict_file must be specified.")
-    dict_path = Path(dict_file)
-    if not dict_path.is_file():
-        raise FileNotFoundError(f"Dictionary file not found: {dict_file}.")
+    ``dict_file`` may also be a list of dictionary paths or a dict of
+    ``{name: path}``. All dictionaries are then scored in one pass over each
+    text's tokens; their columns are prefixed with the name (or, for a list,
+    the file's stem), e.g. ``AEV_Dict_Neg_CWR``, while the shared text
+    metrics appear once.
 
-    if not stopwords_file and not stopwords_text:
-        raise ValueError("Error: Either stopwords_file or stopwords_text must be provided.")
-
-    tokenizer = TwitterAwareTokenizer()
-    stop_remover = StopWordRemover()
+    ``n_jobs`` > 1 shards texts across a process pool (-1 uses every core);
+    ``chunksize`` sets how many texts are sent to a worker at a time. Results
+    are returned in input order and are identical to a serial run.
 
-    if stopwords_file:
-        stopwords_text = load_stopwords_from_file(stopwords_file, encoding)
-    if stopwords_text:
-        stop_remover.build_stoplist(stopwords_text)
+    ``text_output`` ("full", "truncate", "offsets" or "none") controls how the
+    ``text`` and ``CapturedText`` columns are emitted, and ``cache_dir`` enables
+    the compiled dictionary cache, and an ``AnalysisStats`` passed as ``stats``
+    records per-stage timings; see ``iter_vocabulate``. For folder input,
+    ``recursive`` searches subfolders and ``read_threads`` sets how many
+    files are read concurrently; see ``iter_texts`` for supported formats.
 
-    dict_data = DictionaryData()
-    loader = LoadDictionary()
-    try:
-        dict_data = loader.load_dictionary_file(dict_data, dict_file, encoding, csv_delimiter, csv_quote)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load dictionary: {e}")
+    ``output_file`` writes results as Parquet, Feather or CSV according to
+    its suffix (or ``output_format``), flushing every 10,000 rows as they
+    are scored; see ``write_vocabulate``. ``output_csv`` is also written
+    incrementally.
 
-    dict_data.raw_word_counts = raw_counts
+    Pass a ``ResultCache`` as ``result_cache`` to score each distinct text
+    only once; duplicates reuse the cached row under their own Filename.
 
-    # ---------- Determine Input ----------
-    texts_to_process = []
-    filenames = []
+    With ``checkpoint_dir``, every ``checkpoint_every`` scored texts are
+    saved there as they finish. Re-running the same call after an
+    interruption skips texts already scored and only scores new or changed
+    ones (unchanged files are not even read); see ``checkpoint.Checkpoint``.
+    Output files are then written once all texts are done.
+    """
+    tokenizer, stop_remover, dict_data, stopwords_text = _prepare(
+        dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter, csv_quote, cache_dir, stats)
+    schema = _result_schema(dict_data, text_output)
 
-    if isinstance(input_data, pd.DataFrame):
-        if text_column is None:
-            raise ValueError("text_column must be specified for DataFrame input.")
-        if text_column not in input_data.columns:
-            raise ValueError(f"Column '{text_column}' not found in input_data DataFrame.")
-        texts_to_process = input_data[text_column].fillna("").astype(str).tolist()
-        filenames = input_data.index.astype(str).tolist()
-
-    elif isinstance(input_data, (str, Path)):
-        path = Path(input_data)
-        if path.is_file():
-            texts_to_process = [path.read_text(encoding=encoding)]
-            filenames = [path.name]
-        elif path.is_dir():
-            files = list(path.glob("*.txt"))
-            if not files:
-                raise ValueError(f"No .txt files found in directory: {input_data}")
-            for f in files:
-                texts_to_process.append(f.read_text(encoding=encoding))
-                filenames.append(f.name)
-        else:
-            raise ValueError(f"Invalid input path: {input_data}")
-    else:
-        raise ValueError("input_data must be a DataFrame, file path, or folder path.")
+    checkpoint = None
+    if checkpoint_dir:
+        named = _named_dictionaries(dict_file) or [("", dict_file)]
+        settings = {"dictionary": [[namespace, dictionary_cache_key(path, encoding, csv_delimiter, csv_quote)]
+                                   for namespace, path in named],
+                    "stopwords": text_fingerprint(stopwords_text), "raw_counts": raw_counts,
+                    "whitespace_method": whitespace_method, "text_output": text_output,
+                    "truncate_chars": truncate_chars}
+        checkpoint = Checkpoint(checkpoint_dir, settings)
+        if checkpoint.restarted:
+            print(f"♻️ Settings changed since checkpoint {checkpoint_dir} was made; starting over.")
 
-    if not texts_to_process:
+    # ---------- Determine Input ----------
+    # File input is streamed from disk while texts are analyzed; its length
+    # is only known up front when no .jsonl sources are involved.
+    items = iter_texts(input_data, text_column, encoding, recursive=recursive, read_threads=read_threads,
+                       skip_file=checkpoint.unchanged_file if checkpoint is not None else None)
+    total = len(input_data) if isinstance(input_data, pd.DataFrame) else items.total
+    if total == 0:
         raise ValueError("No texts to process.")
 
     # ------------- Process Texts -------------
-    results = []
-    print(f"🔍 Analyzing {len(texts_to_process)} text(s)...")
-
-    for idx, text in enumerate(tqdm(texts_to_process, desc="Processing texts", unit="text")):
-        wc = len(tokenize_whitespace(text, method=whitespace_method))
-        words_raw = tokenizer.tokenize(text)
-        tc_raw = len(words_raw)
-        ttr_raw = (len(set(words_raw)) / tc_raw * 100) if tc_raw else 0
-
-        words_clean = stop_remover.clear_stopwords(words_raw)
-        words_clean = [w for w in words_clean if w]
-        tc_clean = len(words_clean)
-        ttr_clean = (len(set(words_clean)) / tc_clean * 100) if tc_clean else 0
-
-        concept_counts, num_matched_tokens, captured_text, nonmatched = match_dictionary(dict_data, words_clean)
-        tc_nondict = len(nonmatched)
-        ttr_nondict = (len(set(nonmatched)) / tc_nondict * 100) if tc_nondict else 0
-        dict_percent = (num_matched_tokens / tc_raw * 100) if tc_raw else 0
-
-        # Category-level counts
-        category_results = {cat: [0, 0] for cat in dict_data.cat_names}  # [unique_count, total_count]
-        for concept, count in concept_counts.items():
-            if concept in dict_data.concept_map:
-                for category in dict_data.concept_map[concept]:
-                    category_results[category][0] += 1
-                    category_results[category][1] += count
-
-        row = {
-            "Filename": filenames[idx],
-            "text": text,
-            "WC": wc,
-            "TC_Raw": tc_raw,
-            "TTR_Raw": round(ttr_raw, 5),
-            "TC_Clean": tc_clean,
-            "TTR_Clean": round(ttr_clean, 5),
-            "TC_NonDict": tc_nondict,
-            "TTR_NonDict": round(ttr_nondict, 5),
-            "DictPercent": round(dict_percent, 5),
-            "CapturedText": captured_text
-        }
-
-        for cat in dict_data.cat_names:
-            unique_count, total_count = category_results[cat]
-            row[f"{cat}_CWR"] = round(unique_count / wc * 100, 5) if wc else 0
-            row[f"{cat}_CCR"] = round(unique_count / total_count * 100, 5) if total_count else 0
-            if raw_counts:
-                row[f"{cat}_Count"] = total_count
-                row[f"{cat}_Unique"] = unique_count
-
-        results.append(row)
-
-    df_results = pd.DataFrame(results)
+    n_jobs = _resolve_n_jobs(n_jobs) if total is None else min(_resolve_n_jobs(n_jobs), total)
+    if n_jobs > 1 and chunksize is None and total is not None:
+        chunksize = max(1, min(1000, total // (n_jobs * 4)))
+    print(f"🔍 Analyzing {total} text(s)..." if total is not None else f"🔍 Analyzing texts from {input_data}...")
 
+    progress = tqdm(total=total, desc="Processing texts", unit="text")
+    if checkpoint is not None:
+        items = checkpoint.pending(items, on_skip=progress.update)
+    init_args = (dict_file, stopwords_text, raw_counts, encoding, csv_delimiter, csv_quote, whitespace_method,
+                 text_output, truncate_chars, cache_dir, stats is not None)
+    rows = _iter_rows(items, tokenizer, stop_remover, dict_data, whitespace_method, text_output, truncate_chars,
+                      n_jobs, chunksize, init_args, stats, result_cache)
+    outputs = []
     if output_csv:
-        df_results.to_csv(output_csv, index=False, sep=csv_delimiter, quotechar=csv_quote)
-        print(f"✅ Results saved to {output_csv}")
+        outputs.append(_open_output(output_csv, schema, "csv", csv_delimiter, csv_quote))
+    if output_file:
+        outputs.append(_open_output(output_file, schema, output_format, csv_delimiter, csv_quote))
+    # Results are flushed to output files (or the checkpoint) block by block as they are scored
+    if checkpoint is not None:
+        block_size = max(1, min(total or checkpoint_every, checkpoint_every))
+    else:
+        block_size = min(total or 10000, 10000) if outputs else (total or 10000)
+    frames = []
+    try:
+        for columns in _fill_blocks(_tick(rows, progress), schema, dict_data, block_size, stats):
+            data = columns.to_columns()
+            frame = pd.DataFrame(data, columns=list(schema))
+            if checkpoint is not None:
+                checkpoint.save(frame)
+                continue
+            for writer in outputs:
+                writer.write(data)
+            frames.append(frame)
+        progress.close()
+        if checkpoint is not None:
+            if checkpoint.skipped:
+                print(f"♻️ Reused {checkpoint.skipped} result(s) from checkpoint {checkpoint_dir}")
+            frames = [checkpoint.results(list(schema))]
+            for writer in outputs:
+                writer.write(frames[0])
+    finally:
+        progress.close()
+        for writer in outputs:
+            writer.close()
+
+    if not frames or frames[0].empty:
+        raise ValueError("No texts to process.")
+    df_results = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    for writer in outputs:
+        print(f"✅ Results saved to {writer.path}")
 
     print("✅ Analysis complete.")
     return df_results
@@ -0,0 +1,95 @@
+"""
+Content-hash result cache for skipping repeated texts
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+def text_digest(text: str) -> bytes:
+    """128-bit content hash of a text; also behind ``checkpoint.text_fingerprint``."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class ResultCache:
+    """
+    Bounded LRU cache of scored rows, keyed by a hash of the text.
+
+    Pass an instance as ``result_cache=`` to ``run_vocabulate_analysis``,
+    ``iter_vocabulate``, ``write_vocabulate`` or ``VocabulateAnalyzer`` and
+    exact duplicate texts (retweets, templated or bot posts) reuse the row
+    computed for their first occurrence instead of being tokenized and
+    matched again; only the ``Filename`` differs. The least recently used
+    entry is evicted once ``maxsize`` texts are cached.
+
+    A cache can be reused across runs. It remembers the dictionary and
+    options it was filled with and empties itself when used with different
+    ones; it does not notice a dictionary file edited in place. One cache
+    can be shared by threads scoring at once (``VocabulateAnalyzer.ascore``).
+
+    Parameters:
+    -----------
+    maxsize : int
+        Maximum number of distinct texts kept.
+
+    Examples:
+    ---------
+    >>> cache = ResultCache(maxsize=500000)
+    >>> df = run_vocabulate_analysis(..., result_cache=cache)
+    >>> cache.hit_rate
+    0.31
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._settings: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return text_digest(text)
+
+    def bind(self, settings: Hashable):
+        """Empty the cache if it was filled under different scoring ``settings``."""
+        with self._lock:
+            if settings != self._settings:
+                self._entries.clear()
+                self._settings = settings
+
+    def get(self, key: bytes) -> Optional[tuple]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: bytes, result: tuple):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"ResultCache(size={len(self)}, maxsize={self.maxsize}, hits={self.hits}, "
+                f"misses={self.misses}, hit_rate={self.hit_rate:.1%})")
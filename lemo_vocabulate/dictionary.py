@@ -2,10 +2,20 @@
 Dictionary loading and matching utilities
 """
 import csv
+import hashlib
+import os
+import pickle
 import re
-from collections import defaultdict
+import tempfile
+from array import array
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+from .speedups import CAPTURE_MODES, match_tokens, walk_token, wildcard_lookup, wildcard_lookup_token
+
+# Bump whenever DictionaryData's compiled layout changes so stale cache files are ignored
+CACHE_VERSION = 1
 
 class CSVParser:
     @staticmethod
@@ -17,6 +27,122 @@ class CSVParser:
             rows = list(reader)
         return header, rows
 
+def wildcard_regex(wildcard: str) -> str:
+    """Regex source for a dictionary wildcard entry: ``*`` matches anything, anchored at the start only."""
+    return '^' + re.escape(wildcard).replace(r'\*', '.*')
+
+class LazyPatterns(Mapping):
+    """Read-only mapping of wildcard -> compiled pattern that compiles each pattern on first access.
+
+    Only pickles the pattern sources, so a cached dictionary loads without
+    recompiling thousands of regexes that the wildcard index never needs.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, str]] = None):
+        self._sources: Dict[str, str] = sources or {}
+        self._compiled: Dict[str, re.Pattern] = {}
+
+    def __getitem__(self, wildcard: str) -> re.Pattern:
+        pattern = self._compiled.get(wildcard)
+        if pattern is None:
+            pattern = self._compiled[wildcard] = re.compile(self._sources[wildcard])
+        return pattern
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def __getstate__(self):
+        return self._sources
+
+    def __setstate__(self, sources):
+        self._sources, self._compiled = sources, {}
+
+class TokenTrie:
+    """Token-level trie for multi-word dictionary entries.
+
+    Each node is a plain dict keyed by token; the concept for an entry that
+    ends at a node is stored under the ``None`` key, which can never collide
+    with a token string.
+    """
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def insert(self, tokens: List[str], concept: str):
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[None] = concept
+
+    def longest_match(self, words: List[str], start: int, max_len: int) -> Tuple[int, str]:
+        """Return (length, concept) of the longest entry starting at ``start``, or (0, None)."""
+        node = self.root
+        best_len, best_concept = 0, None
+        end = min(len(words), start + max_len)
+        for j in range(start, end):
+            node = node.get(words[j])
+            if node is None:
+                break
+            if None in node:
+                best_len, best_concept = j - start + 1, node[None]
+        return best_len, best_concept
+
+class WildcardIndex:
+    """Character trie over the literal prefix (text before the first ``*``) of each wildcard.
+
+    Wildcards of the plain ``prefix*`` form are resolved by the walk alone. Any
+    other shape (``a*b``, multi-word entries with an inner ``*``) is kept at the
+    node for its literal prefix and verified with its compiled pattern, so the
+    first wildcard in file order still wins exactly as with a linear scan.
+
+    Single-token lookups, and the walk through the first token of longer
+    lookups, are memoized per token. The memos are per process, are not
+    pickled, and are emptied once they hold ``MEMO_SIZE`` tokens. The
+    lookups themselves live in ``_speedups``, compiled when available.
+    """
+
+    MEMO_SIZE = 100000
+
+    def __init__(self):
+        self.root: Dict = {}
+        self._memo: Dict[str, Optional[str]] = {}
+        self._walks: Dict[str, Tuple[Optional[Dict], tuple]] = {}
+
+    def __getstate__(self):
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.root = state['root']
+        self._memo, self._walks = {}, {}
+
+    def insert(self, order: int, wildcard: str, concept: str):
+        literal = wildcard.split('*', 1)[0]
+        node = self.root
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        # [order of first prefix-only wildcard, its concept, [(order, pattern, concept), ...]]
+        entry = node.setdefault(None, [None, None, []])
+        if wildcard.rstrip('*') == literal:
+            if entry[0] is None:
+                entry[0], entry[1] = order, concept
+        else:
+            entry[2].append((order, re.compile(wildcard_regex(wildcard)), concept))
+
+    def lookup(self, words: List[str], start: int, n: int):
+        """Return the concept of the first wildcard matching ``words[start:start+n]``, or None."""
+        return wildcard_lookup(self, words, start, n)
+
+    def _walk_token(self, token: str) -> Tuple[Optional[Dict], tuple]:
+        """The node reached by walking ``token`` from the root (None if it leaves the trie) and the entries passed."""
+        return walk_token(self, token)
+
+    def lookup_token(self, token: str) -> Optional[str]:
+        """Memoized ``lookup`` of a single token."""
+        return wildcard_lookup_token(self, token)
+
 class DictionaryData:
     def __init__(self):
         self.num_cats: int = 0
@@ -30,9 +156,61 @@ class DictionaryData:
         self.concept_map: Dict[str, List[str]] = {}
         self.full_dictionary_map: Dict[str, Dict[int, Dict[str, str]]] = {'Wildcards': {}, 'Standards': {}}
         self.wildcard_arrays: Dict[int, List[str]] = {}
-        self.precompiled_wildcards: Dict[str, re.Pattern] = {}
+        self.precompiled_wildcards: Mapping = LazyPatterns()
+        self.standards_trie: TokenTrie = TokenTrie()
+        self.wildcard_index: Dict[int, WildcardIndex] = {}
+        # Concept x category indicator matrix in CSR form: the categories of
+        # concept_index[c] are concept_category_indices[indptr[c]:indptr[c+1]]
+        self.concept_index: Dict[str, int] = {}
+        self.concept_category_indptr: array = array('q', [0])
+        self.concept_category_indices: array = array('q')
         self.dictionary_loaded: bool = False
 
+    def concept_category_matrix(self):
+        """Return the concept x category indicator matrix as a scipy.sparse CSR matrix."""
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("concept_category_matrix requires scipy: pip install scipy")
+        data = [1] * len(self.concept_category_indices)
+        return csr_matrix((data, self.concept_category_indices, self.concept_category_indptr),
+                          shape=(len(self.concept_index), self.num_cats))
+
+class DictionarySet:
+    """Several dictionaries scored against the same token stream, with namespaced categories.
+
+    Each member is matched on its own, exactly as if it were scored alone.
+    Their concept x category matrices are stacked block-diagonally, with
+    concept ids of each member shifted by its ``offset`` and categories
+    renamed ``<namespace>_<category>``, so category metrics for every
+    dictionary are aggregated in one pass.
+    """
+
+    def __init__(self, dictionaries: List[Tuple[str, DictionaryData]]):
+        self.members: List[Tuple[str, DictionaryData, int]] = []
+        self.cat_names: List[str] = []
+        self.concept_category_indptr: array = array('q', [0])
+        self.concept_category_indices: array = array('q')
+        concept_offset, cat_offset = 0, 0
+        for namespace, dict_data in dictionaries:
+            self.members.append((namespace, dict_data, concept_offset))
+            self.cat_names.extend(f"{namespace}_{cat}" for cat in dict_data.cat_names)
+            base = self.concept_category_indptr[-1]
+            self.concept_category_indptr.extend(base + k for k in dict_data.concept_category_indptr[1:])
+            self.concept_category_indices.extend(cat_offset + i for i in dict_data.concept_category_indices)
+            concept_offset += len(dict_data.concept_category_indptr) - 1
+            cat_offset += dict_data.num_cats
+        self.num_cats: int = cat_offset
+
+    @property
+    def raw_word_counts(self) -> bool:
+        return all(dict_data.raw_word_counts for _, dict_data, _ in self.members)
+
+    @raw_word_counts.setter
+    def raw_word_counts(self, value: bool):
+        for _, dict_data, _ in self.members:
+            dict_data.raw_word_counts = value
+
 # ------------------- Load Dictionary -------------------
 class LoadDictionary:
     def load_dictionary_file(self, dict_data: DictionaryData, input_file: str,
@@ -40,7 +218,9 @@ class LoadDictionary:
         dict_data.max_words = 0
         dict_data.full_dictionary_map = {'Wildcards': {}, 'Standards': {}}
         dict_data.wildcard_arrays = {}
-        dict_data.precompiled_wildcards = {}
+        wildcard_sources: Dict[str, str] = {}
+        dict_data.standards_trie = TokenTrie()
+        dict_data.wildcard_index = {}
         wildcard_lists: Dict[int, List[str]] = {}
         dict_data.concept_map = {}
 
@@ -75,58 +255,114 @@ class LoadDictionary:
                         wildcard_lists[words_in_entry] = []
                     dict_data.full_dictionary_map['Wildcards'][words_in_entry][word_trimmed] = concept
                     wildcard_lists[words_in_entry].append(word_trimmed)
-                    pattern = '^' + re.escape(word_trimmed).replace(r'\*', '.*')
-                    dict_data.precompiled_wildcards[word_trimmed] = re.compile(pattern)
+                    wildcard_sources[word_trimmed] = wildcard_regex(word_trimmed)
                 else:
                     if words_in_entry not in dict_data.full_dictionary_map['Standards']:
                         dict_data.full_dictionary_map['Standards'][words_in_entry] = {}
                     dict_data.full_dictionary_map['Standards'][words_in_entry][word_trimmed] = concept
 
+        dict_data.precompiled_wildcards = LazyPatterns(wildcard_sources)
+
         for i in range(dict_data.max_words, 0, -1):
             if i in wildcard_lists:
                 dict_data.wildcard_arrays[i] = wildcard_lists[i]
 
+        # Standards are matched token-by-token against the trie. An entry is only
+        # reachable if splitting it on single spaces gives exactly its word count;
+        # anything else (tabs, double spaces) could never equal a ' '-joined n-gram.
+        for n, entries in dict_data.full_dictionary_map['Standards'].items():
+            for entry, concept in entries.items():
+                tokens = entry.split(' ')
+                if len(tokens) == n:
+                    dict_data.standards_trie.insert(tokens, concept)
+
+        for n, wildcards in dict_data.wildcard_arrays.items():
+            index = WildcardIndex()
+            for order, wildcard in enumerate(wildcards):
+                index.insert(order, wildcard, dict_data.full_dictionary_map['Wildcards'][n][wildcard])
+            dict_data.wildcard_index[n] = index
+
+        category_positions = {}
+        for i, cat in enumerate(dict_data.cat_names):
+            category_positions.setdefault(cat, i)
+        dict_data.concept_index = {}
+        dict_data.concept_category_indptr = array('q', [0])
+        dict_data.concept_category_indices = array('q')
+        for concept, categories in dict_data.concept_map.items():
+            dict_data.concept_index[concept] = len(dict_data.concept_index)
+            dict_data.concept_category_indices.extend(category_positions[cat] for cat in categories)
+            dict_data.concept_category_indptr.append(len(dict_data.concept_category_indices))
+
         dict_data.dictionary_loaded = True
         return dict_data
 
-def match_dictionary(dict_data: DictionaryData, words: List[str]) -> Tuple[Dict[str, int], int, str, List[str]]:
-    concept_counts = defaultdict(int)
-    num_matched_tokens = 0
-    captured = []
-    nonmatched = []
-    i = 0
-
-    while i < len(words):
-        matched = False
-        for n in range(dict_data.max_words, 0, -1):
-            if i + n > len(words):
-                continue
-            target = ' '.join(words[i:i+n])
-            # Check standards
-            if n in dict_data.full_dictionary_map['Standards'] and target in dict_data.full_dictionary_map['Standards'][n]:
-                concept = dict_data.full_dictionary_map['Standards'][n][target]
-                concept_counts[concept] += 1
-                num_matched_tokens += n
-                captured.append(target)
-                i += n
-                matched = True
-                break
-            # Check wildcards
-            if n in dict_data.wildcard_arrays:
-                for wildcard in dict_data.wildcard_arrays[n]:
-                    if dict_data.precompiled_wildcards[wildcard].match(target):
-                        concept = dict_data.full_dictionary_map['Wildcards'][n][wildcard]
-                        concept_counts[concept] += 1
-                        num_matched_tokens += n
-                        captured.append(target)
-                        i += n
-                        matched = True
-                        break
-            if matched:
-                break
-        if not matched:
-            nonmatched.append(words[i])
-            i += 1
+    def load_dictionary_cached(self, input_file: str, encoding: str, csv_delimiter: str, csv_quote: str,
+                               cache_dir: Optional[str] = None) -> DictionaryData:
+        """
+        Load a compiled dictionary from the cache, compiling and caching it on a miss.
+
+        Cache files are keyed by the SHA-256 of the dictionary file plus the
+        loader options, so editing the file or changing options never serves
+        a stale entry. ``cache_dir`` defaults to $LEMO_VOCABULATE_CACHE_DIR or
+        ~/.cache/lemo_vocabulate. Cache files are pickles; only point
+        ``cache_dir`` at a directory you trust.
+        """
+        cache_path = Path(cache_dir or default_cache_dir()) / (
+            dictionary_cache_key(input_file, encoding, csv_delimiter, csv_quote) + ".pkl")
+        if cache_path.is_file():
+            try:
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception:
+                pass  # unreadable or from an incompatible version; rebuild below
+
+        dict_data = self.load_dictionary_file(DictionaryData(), input_file, encoding, csv_delimiter, csv_quote)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=str(cache_path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dict_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return dict_data
+
+def default_cache_dir() -> str:
+    return os.environ.get("LEMO_VOCABULATE_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "lemo_vocabulate")
+
+def dictionary_cache_key(input_file: str, encoding: str, csv_delimiter: str, csv_quote: str) -> str:
+    """Hash of the dictionary file's contents and the options it is loaded with."""
+    digest = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(repr((CACHE_VERSION, encoding, csv_delimiter, csv_quote)).encode('utf-8'))
+    return digest.hexdigest()
+
+def match_dictionary(dict_data: DictionaryData, words: List[str],
+                     capture: Optional[str] = "text") -> Tuple[Dict[str, int], int, str, List[str]]:
+    """Greedy longest-first matching of ``words`` against the dictionary.
+
+    At each position the longest matching n-gram wins; at equal length a
+    standard entry beats a wildcard, and among wildcards the first in file
+    order wins.
+
+    ``capture`` controls the third return value: "text" (default) gives the
+    matched words joined by spaces, "offsets" gives a list of (start, end)
+    token spans into ``words``, and None skips capturing and returns ''.
 
-    captured_text = ' '.join(captured)
-    return dict(concept_counts), num_matched_tokens, captured_text, nonmatched
\ No newline at end of file
+    The loop itself is ``_speedups.match_tokens``, compiled when available.
+    """
+    if not isinstance(words, list):
+        words = list(words)
+    concept_counts, num_matched_tokens, captured, nonmatched = match_tokens(
+        dict_data.standards_trie.root, dict_data.wildcard_index, dict_data.max_words, words, CAPTURE_MODES[capture])
+    if capture == "text":
+        return concept_counts, num_matched_tokens, ' '.join(captured), nonmatched
+    if capture == "offsets":
+        return concept_counts, num_matched_tokens, captured, nonmatched
+    return concept_counts, num_matched_tokens, '', nonmatched
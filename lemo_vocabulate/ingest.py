@@ -0,0 +1,182 @@
+"""
+File ingestion: directory traversal, compressed and JSON Lines sources, threaded prefetching
+"""
+import gzip
+import io
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+COMPRESSIONS = (".gz", ".zst")
+FORMATS = (".txt", ".jsonl")
+
+# Placeholder for a whole file that skip_file said not to read
+_UNCHANGED = object()
+
+def source_format(path: Path) -> Tuple[Optional[str], Optional[str]]:
+    """Return (format, compression) for a file name, e.g. ('.jsonl', '.gz'), or (None, None) if unsupported."""
+    name = path.name.lower()
+    compression = None
+    for suffix in COMPRESSIONS:
+        if name.endswith(suffix):
+            compression, name = suffix, name[:-len(suffix)]
+            break
+    for suffix in FORMATS:
+        if name.endswith(suffix):
+            return suffix, compression
+    return None, None
+
+def find_sources(directory: Path, recursive: bool = False) -> List[Path]:
+    """Supported files in ``directory`` (and subdirectories if ``recursive``), in sorted order."""
+    candidates = directory.rglob("*") if recursive else directory.glob("*")
+    return sorted(p for p in candidates if p.is_file() and source_format(p)[0] is not None)
+
+def open_source(path: Path, encoding: str = "utf-8"):
+    """Open a possibly compressed source file for reading text."""
+    _, compression = source_format(path)
+    if compression == ".gz":
+        return gzip.open(path, "rt", encoding=encoding)
+    if compression == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst files requires zstandard: pip install lemo-vocabulate[zstd]")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding=encoding)
+    return open(path, "r", encoding=encoding)
+
+def read_json_lines(lines: Iterable[str], name: str, text_field: str = "text", id_field: Optional[str] = None,
+                    source: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """(id, text) pairs from JSON Lines; documents without an id are named ``<name>:<line number>``."""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {line_number} of {source or name}: {e}")
+        text = record.get(text_field)
+        doc_id = record.get(id_field) if id_field else None
+        yield (f"{name}:{line_number}" if doc_id is None else str(doc_id),
+               "" if text is None else str(text))
+
+class DocumentReader:
+    """
+    Iterable of (id, text) pairs read from a list of source files.
+
+    Whole-file sources (.txt, .txt.gz, .txt.zst) are read by a thread pool
+    up to ``prefetch`` files ahead of the consumer, so file I/O overlaps with
+    analysis. JSON Lines sources yield one document per line and are
+    streamed rather than loaded whole. Documents come out in source order.
+
+    Parameters:
+    -----------
+    sources : list of Path
+        Files to read, in order.
+    root : Path, optional
+        If given, ids are paths relative to ``root``; otherwise file names.
+    read_threads : int
+        Threads reading files concurrently.
+    prefetch : int
+        Maximum number of files read ahead of the consumer.
+    text_field, id_field : str
+        JSON Lines keys for the text and, optionally, the id. Without
+        ``id_field``, line documents are named ``<file>:<line number>``.
+    skip_file : callable, optional
+        Called with (path, id) for each whole-file source; if it returns
+        True the file is not read and (id, None) is yielded in its place.
+    """
+
+    def __init__(self, sources: List[Path], root: Optional[Path] = None, encoding: str = "utf-8",
+                 read_threads: int = 8, prefetch: int = 64, text_field: str = "text",
+                 id_field: Optional[str] = None, skip_file: Optional[Callable[[Path, str], bool]] = None):
+        self.sources = list(sources)
+        self.root = root
+        self.encoding = encoding
+        self.read_threads = max(1, read_threads)
+        self.prefetch = max(1, prefetch)
+        self.text_field = text_field
+        self.id_field = id_field
+        self.skip_file = skip_file
+
+    def __repr__(self):
+        return f"DocumentReader({len(self.sources)} file(s))"
+
+    @property
+    def total(self) -> Optional[int]:
+        """Number of documents if known up front (no JSON Lines sources), else None."""
+        if any(source_format(p)[0] == ".jsonl" for p in self.sources):
+            return None
+        return len(self.sources)
+
+    def _name(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix() if self.root is not None else path.name
+
+    def _read_whole(self, path: Path) -> Tuple[str, str]:
+        with open_source(path, self.encoding) as f:
+            return self._name(path), f.read()
+
+    def _read_lines(self, path: Path) -> Iterator[Tuple[str, str]]:
+        with open_source(path, self.encoding) as f:
+            yield from read_json_lines(f, self._name(path), self.text_field, self.id_field, str(path))
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        with ThreadPoolExecutor(max_workers=self.read_threads) as executor:
+            pending = deque()
+            upcoming = iter(self.sources)
+
+            def fill():
+                while len(pending) < self.prefetch:
+                    path = next(upcoming, None)
+                    if path is None:
+                        return
+                    if source_format(path)[0] == ".jsonl":
+                        pending.append((path, None))
+                    elif self.skip_file is not None and self.skip_file(path, self._name(path)):
+                        pending.append((path, _UNCHANGED))
+                    else:
+                        pending.append((path, executor.submit(self._read_whole, path)))
+
+            fill()
+            try:
+                while pending:
+                    path, future = pending.popleft()
+                    fill()
+                    if future is None:
+                        yield from self._read_lines(path)
+                    elif future is _UNCHANGED:
+                        yield self._name(path), None
+                    else:
+                        yield future.result()
+            finally:
+                for _, future in pending:
+                    if future is not None and future is not _UNCHANGED:
+                        future.cancel()
+
+def read_path(input_path, recursive: bool = False, **options) -> DocumentReader:
+    """
+    A ``DocumentReader`` over a single file or the supported files in a folder.
+
+    ``options`` are passed on to ``DocumentReader``. Raises ValueError if the
+    path does not exist or a folder holds no supported files.
+    """
+    path = Path(input_path)
+    if path.is_file():
+        return DocumentReader([path], **options)
+    if path.is_dir():
+        files = find_sources(path, recursive)
+        if not files:
+            raise ValueError(f"No .txt or .jsonl files (optionally .gz/.zst) found in directory: {input_path}")
+        return DocumentReader(files, root=path if recursive else None, **options)
+    raise ValueError(f"Invalid input path: {input_path}")
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
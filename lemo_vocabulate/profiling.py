@@ -0,0 +1,126 @@
+"""
+Opt-in timing instrumentation for the analysis pipeline
+"""
+import time
+from typing import Callable, Dict, Optional
+
+class AnalysisStats:
+    """
+    Cumulative per-stage timings and throughput for an analysis run.
+
+    Pass an instance as ``stats=`` to ``run_vocabulate_analysis``,
+    ``iter_vocabulate`` or ``VocabulateAnalyzer`` to record how long each
+    pipeline stage takes. Without it the uninstrumented fast path is used.
+
+    Parameters:
+    -----------
+    callback : callable, optional
+        Called with this object every ``report_every`` texts, e.g. to push
+        metrics to a monitoring system.
+    report_every : int
+        How many texts between callback invocations.
+
+    Stage times from worker processes (``n_jobs`` > 1) are summed across
+    workers, so they can exceed the wall-clock ``elapsed_seconds``.
+
+    Examples:
+    ---------
+    >>> stats = AnalysisStats()
+    >>> df = run_vocabulate_analysis(..., stats=stats)
+    >>> print(stats.summary())
+    """
+
+    STAGES = ("whitespace_count", "tokenize", "stopwords", "match", "aggregate")
+
+    def __init__(self, callback: Optional[Callable[["AnalysisStats"], None]] = None, report_every: int = 10000):
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(self.STAGES, 0.0)
+        self.stage_calls: Dict[str, int] = dict.fromkeys(self.STAGES, 0)
+        self.dictionary_load_seconds: float = 0.0
+        self.dictionary_loads: int = 0
+        self.texts: int = 0
+        self.tokens: int = 0
+        self.callback = callback
+        self.report_every = report_every
+        self._elapsed: float = 0.0
+        self._started: Optional[float] = None
+
+    # ---------- Recording ----------
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        self.stage_seconds[stage] += seconds
+        self.stage_calls[stage] += calls
+
+    def add_dictionary_load(self, seconds: float):
+        self.dictionary_load_seconds += seconds
+        self.dictionary_loads += 1
+
+    def add_text(self, tokens: int):
+        self.texts += 1
+        self.tokens += tokens
+        if self.callback is not None and self.texts % self.report_every == 0:
+            self.callback(self)
+
+    def merge(self, other: "AnalysisStats"):
+        """Fold in stage timings and counts recorded elsewhere, e.g. in a worker process."""
+        before = self.texts
+        for stage in self.STAGES:
+            self.add(stage, other.stage_seconds[stage], other.stage_calls[stage])
+        self.dictionary_load_seconds += other.dictionary_load_seconds
+        self.dictionary_loads += other.dictionary_loads
+        self.texts += other.texts
+        self.tokens += other.tokens
+        if self.callback is not None and self.texts // self.report_every > before // self.report_every:
+            self.callback(self)
+
+    def start(self):
+        if self._started is None:
+            self._started = time.perf_counter()
+
+    def stop(self):
+        if self._started is not None:
+            self._elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    # ---------- Reporting ----------
+    @property
+    def elapsed_seconds(self) -> float:
+        """Wall-clock time spent inside runs; falls back to summed stage time if never started."""
+        running = time.perf_counter() - self._started if self._started is not None else 0.0
+        return (self._elapsed + running) or sum(self.stage_seconds.values())
+
+    @property
+    def texts_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.texts / elapsed if elapsed else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.tokens / elapsed if elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "stage_seconds": dict(self.stage_seconds),
+            "stage_calls": dict(self.stage_calls),
+            "dictionary_load_seconds": self.dictionary_load_seconds,
+            "dictionary_loads": self.dictionary_loads,
+            "texts": self.texts,
+            "tokens": self.tokens,
+            "elapsed_seconds": self.elapsed_seconds,
+            "texts_per_second": self.texts_per_second,
+            "tokens_per_second": self.tokens_per_second,
+        }
+
+    def summary(self) -> str:
+        total = sum(self.stage_seconds.values()) or 1.0
+        lines = [f"{'stage':<18}{'seconds':>10}{'calls':>10}{'share':>8}"]
+        for stage in self.STAGES:
+            seconds = self.stage_seconds[stage]
+            lines.append(f"{stage:<18}{seconds:>10.3f}{self.stage_calls[stage]:>10}{seconds / total:>8.1%}")
+        lines.append(f"dictionary load: {self.dictionary_load_seconds:.3f}s over {self.dictionary_loads} load(s)")
+        lines.append(f"{self.texts} texts, {self.tokens} tokens in {self.elapsed_seconds:.3f}s "
+                     f"({self.texts_per_second:,.0f} texts/s, {self.tokens_per_second:,.0f} tokens/s)")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return (f"AnalysisStats(texts={self.texts}, tokens={self.tokens}, "
+                f"texts_per_second={self.texts_per_second:.1f})")
@@ -0,0 +1,184 @@
+"""
+Hot-reloadable dictionaries for long-running services
+"""
+import os
+import threading
+import time
+from time import perf_counter
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+from .dictionary import DictionaryData, DictionarySet, dictionary_cache_key
+from .profiling import AnalysisStats
+from .scoring import _load_dictionary, _named_dictionaries
+
+class DictionarySnapshot(NamedTuple):
+    """One fully built version of a registry's dictionaries. Never modified once published."""
+    version: int
+    dict_data: Union[DictionaryData, DictionarySet]
+    content_keys: Tuple[str, ...]   # dictionary_cache_key of each file, in order
+    loaded_at: float                # time.time() when the snapshot was published
+
+class DictionaryRegistry:
+    """
+    Serves the current version of a set of dictionary files and rebuilds it when they change.
+
+    The dictionaries are loaded once up front. ``start()`` then polls the
+    files every ``poll_interval`` seconds from a background thread; when one
+    changes, the new version is built on that thread while scoring continues
+    on the old one, and is published by swapping a single reference to an
+    immutable ``DictionarySnapshot``. Code that took a snapshot keeps using
+    it, so a batch in flight during a reload finishes on the version it
+    started with. Versions are numbered from 1 and only increase.
+
+    A file that was touched but whose contents did not change does not
+    create a new version. If a rebuild fails (a missing or malformed file),
+    the previous version stays current, the error is kept in ``last_error``
+    (until a later version is published) and passed to ``on_error``, and
+    the next change is tried again. Replace files atomically (write a
+    temporary file, then rename it) so a half written dictionary is never
+    loaded.
+
+    Parameters:
+    -----------
+    dict_file :
+        Dictionary CSV path, list of paths or {name: path}, as for ``run_vocabulate_analysis``.
+    raw_counts, encoding, csv_delimiter, csv_quote, cache_dir :
+        As for ``run_vocabulate_analysis``.
+    poll_interval : float
+        Seconds between checks of the files' modification times and sizes.
+    on_reload : callable, optional
+        Called with each newly published ``DictionarySnapshot``.
+    on_error : callable, optional
+        Called with the exception when a background rebuild fails.
+    stats : AnalysisStats, optional
+        Records the time taken by each dictionary load.
+
+    Examples:
+    ---------
+    >>> registry = DictionaryRegistry(get_data_path("AEV_Dict.csv")).start()
+    >>> analyzer = VocabulateAnalyzer(registry, stopwords_file=get_data_path("stopwords.txt"))
+    >>> analyzer.score("so angry")["DictVersion"]
+    1
+    >>> registry.stop()
+    """
+
+    def __init__(self, dict_file, raw_counts: bool = True, encoding: str = "utf-8", csv_delimiter: str = ",",
+                 csv_quote: str = '"', cache_dir: Optional[str] = None, poll_interval: float = 2.0,
+                 on_reload: Optional[Callable[[DictionarySnapshot], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None, stats: Optional[AnalysisStats] = None):
+        if not dict_file:
+            raise ValueError("Error: dict_file must be specified.")
+        self.dict_file = dict_file
+        self.paths: List[str] = [str(path) for _, path in _named_dictionaries(dict_file) or [("", dict_file)]]
+        for path in self.paths:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Dictionary file not found: {path}.")
+        self.raw_counts = raw_counts
+        self.encoding = encoding
+        self.csv_delimiter = csv_delimiter
+        self.csv_quote = csv_quote
+        self.cache_dir = cache_dir
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.stats = stats
+        self.last_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamps = self._file_stamps()
+        self._snapshot = self._build(1, self._content_keys())
+
+    @property
+    def current(self) -> DictionarySnapshot:
+        """The latest published snapshot. Hold on to it for as long as one batch needs a consistent version."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild and publish a new version if any file changed, or always with ``force``.
+
+        Returns True if a new snapshot was published. Errors are raised to the
+        caller and leave the current snapshot in place.
+        """
+        with self._lock:
+            stamps = self._file_stamps()
+            if stamps == self._stamps and not force:
+                return False
+            # A failed rebuild is retried once the files change again, not on every poll
+            self._stamps = stamps
+            current = self._snapshot
+            content_keys = self._content_keys()
+            if content_keys == current.content_keys and not force:
+                return False
+            snapshot = self._build(current.version + 1, content_keys)
+            self._snapshot = snapshot
+            self.last_error = None
+        if self.on_reload is not None:
+            self.on_reload(snapshot)
+        return True
+
+    def start(self) -> "DictionaryRegistry":
+        """Watch the files from a daemon thread. Returns the registry, for chaining."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="lemo-vocabulate-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching; the current snapshot stays usable."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "DictionaryRegistry":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __repr__(self):
+        return f"DictionaryRegistry(files={len(self.paths)}, version={self.version})"
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                self.last_error = e
+                if self.on_error is not None:
+                    self.on_error(e)
+
+    def _build(self, version: int, content_keys: Tuple[str, ...]) -> DictionarySnapshot:
+        started = perf_counter()
+        dict_data = _load_dictionary(self.dict_file, self.encoding, self.csv_delimiter, self.csv_quote,
+                                     self.raw_counts, self.cache_dir)
+        if self.stats is not None:
+            self.stats.add_dictionary_load(perf_counter() - started)
+        # A file rewritten while it was being loaded may have been read half written
+        if self._content_keys() != content_keys:
+            self._stamps = []
+            raise RuntimeError("Dictionary files changed while loading; will retry on the next poll.")
+        return DictionarySnapshot(version, dict_data, content_keys, time.time())
+
+    def _file_stamps(self) -> List[Optional[Tuple[int, int]]]:
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Reported once by the rebuild that follows, not on every poll
+                stamps.append(None)
+                continue
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        return stamps
+
+    def _content_keys(self) -> Tuple[str, ...]:
+        return tuple(dictionary_cache_key(path, self.encoding, self.csv_delimiter, self.csv_quote)
+                     for path in self.paths)
@@ -0,0 +1,331 @@
+"""
+Per-text scoring: dictionary and stoplist setup, matching, and result columns
+
+Kept free of pandas and tqdm so lightweight callers (the command line tool,
+``VocabulateAnalyzer``) start quickly; ``core`` builds the DataFrame, file and
+multiprocessing front ends on top of it.
+"""
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional, Tuple, Union
+import numpy as np
+
+from .tokenizer import TwitterAwareTokenizer, count_whitespace_words
+from .stopwords import StopWordRemover, load_stopwords_from_file
+from .dictionary import DictionaryData, DictionarySet, LoadDictionary, match_dictionary
+from .profiling import AnalysisStats
+from .speedups import remove_stopwords
+from .vocab import count_unique
+from .windowed import score_windowed
+
+def _load_dictionary(dict_file, encoding, csv_delimiter, csv_quote, raw_counts,
+                     cache_dir=None) -> Union[DictionaryData, DictionarySet]:
+    named = _named_dictionaries(dict_file)
+    if named is None:
+        return _load_one_dictionary(dict_file, encoding, csv_delimiter, csv_quote, raw_counts, cache_dir)
+    return DictionarySet([(namespace, _load_one_dictionary(path, encoding, csv_delimiter, csv_quote, raw_counts,
+                                                            cache_dir))
+                          for namespace, path in named])
+
+def _load_one_dictionary(dict_file, encoding, csv_delimiter, csv_quote, raw_counts,
+                         cache_dir=None) -> DictionaryData:
+    dict_data = DictionaryData()
+    loader = LoadDictionary()
+    try:
+        if cache_dir:
+            dict_data = loader.load_dictionary_cached(dict_file, encoding, csv_delimiter, csv_quote, cache_dir)
+        else:
+            dict_data = loader.load_dictionary_file(dict_data, dict_file, encoding, csv_delimiter, csv_quote)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load dictionary: {e}")
+
+    dict_data.raw_word_counts = raw_counts
+    return dict_data
+
+def _named_dictionaries(dict_file) -> Optional[List[Tuple[str, str]]]:
+    """(namespace, path) pairs when ``dict_file`` names several dictionaries, None for a single file."""
+    if isinstance(dict_file, Mapping):
+        named = [(str(namespace), path) for namespace, path in dict_file.items()]
+    elif isinstance(dict_file, (list, tuple)):
+        named = [(Path(path).stem, path) for path in dict_file]
+    else:
+        return None
+    if not named:
+        raise ValueError("Error: dict_file must name at least one dictionary.")
+    namespaces = [namespace for namespace, _ in named]
+    if len(set(namespaces)) != len(namespaces):
+        raise ValueError(f"Dictionary namespaces must be unique, got {namespaces}; pass a dict of name -> path.")
+    return named
+
+def _dictionary_members(dict_data) -> List[Tuple[str, DictionaryData, int]]:
+    """(namespace, dictionary, concept id offset) for each dictionary scored; one unnamed member for a single file."""
+    if isinstance(dict_data, DictionarySet):
+        return dict_data.members
+    return [("", dict_data, 0)]
+
+def _prepare(dict_file, stopwords_text, stopwords_file, raw_counts, encoding, csv_delimiter, csv_quote,
+             cache_dir=None, stats: Optional[AnalysisStats] = None):
+    """Validate arguments and build the tokenizer, stoplist and dictionary shared by every entry point."""
+    if not dict_file:
+        raise ValueError("Error: dict_file must be specified.")
+    named = _named_dictionaries(dict_file)
+    for _, path in named or [("", dict_file)]:
+        if not Path(path).is_file():
+            raise FileNotFoundError(f"Dictionary file not found: {path}.")
+
+    tokenizer, stop_remover, stopwords_text = _prepare_text(stopwords_text, stopwords_file, encoding)
+
+    started = perf_counter()
+    dict_data = _load_dictionary(dict_file, encoding, csv_delimiter, csv_quote, raw_counts, cache_dir)
+    if stats is not None:
+        stats.add_dictionary_load(perf_counter() - started)
+    return tokenizer, stop_remover, dict_data, stopwords_text
+
+def _prepare_text(stopwords_text, stopwords_file, encoding) -> Tuple[TwitterAwareTokenizer, StopWordRemover, str]:
+    """The tokenizer and stoplist half of ``_prepare``, for callers that bring their own dictionary."""
+    if not stopwords_file and not stopwords_text:
+        raise ValueError("Error: Either stopwords_file or stopwords_text must be provided.")
+
+    tokenizer = TwitterAwareTokenizer()
+    stop_remover = StopWordRemover()
+
+    if stopwords_file:
+        stopwords_text = load_stopwords_from_file(stopwords_file, encoding)
+    if stopwords_text:
+        stop_remover.build_stoplist(stopwords_text)
+    return tokenizer, stop_remover, stopwords_text or ""
+
+TEXT_OUTPUT_MODES = ("full", "truncate", "offsets", "none")
+
+def _result_schema(dict_data: Union[DictionaryData, DictionarySet], text_output: str = "full") -> dict:
+    """Ordered result columns and their dtypes for the given dictionary and text output mode."""
+    if text_output not in TEXT_OUTPUT_MODES:
+        raise ValueError(f"text_output must be one of {TEXT_OUTPUT_MODES}, got '{text_output}'.")
+    schema = {"Filename": object}
+    if text_output in ("full", "truncate"):
+        schema["text"] = object
+    schema.update({"WC": np.int64, "TC_Raw": np.int64, "TTR_Raw": np.float64,
+                   "TC_Clean": np.int64, "TTR_Clean": np.float64})
+    # Matching metrics are per dictionary, prefixed with its namespace when several are scored
+    for namespace, _, _ in _dictionary_members(dict_data):
+        prefix = f"{namespace}_" if namespace else ""
+        schema.update({f"{prefix}TC_NonDict": np.int64, f"{prefix}TTR_NonDict": np.float64,
+                       f"{prefix}DictPercent": np.float64})
+        if text_output in ("full", "truncate"):
+            schema[f"{prefix}CapturedText"] = object
+        elif text_output == "offsets":
+            schema[f"{prefix}CapturedOffsets"] = object
+    for cat in dict_data.cat_names:
+        schema[f"{cat}_CWR"] = np.float64
+        schema[f"{cat}_CCR"] = np.float64
+        if dict_data.raw_word_counts:
+            schema[f"{cat}_Count"] = np.int64
+            schema[f"{cat}_Unique"] = np.int64
+    return schema
+
+# Texts at least this long are tokenized into interned token ids (see vocab.TokenVocabulary),
+# which keeps much less memory per token alive; shorter texts are faster as plain lists
+INTERN_MIN_CHARS = 20000
+
+# Texts at least this long are tokenized and matched in windows (see windowed.score_windowed),
+# so memory stays bounded however long a single document is
+WINDOW_MIN_CHARS = 4 << 20
+
+def _analyze_text(text: str, filename: str, tokenizer: TwitterAwareTokenizer, stop_remover: StopWordRemover,
+                  dict_data: Union[DictionaryData, DictionarySet], whitespace_method: str, text_output: str = "full",
+                  truncate_chars: int = 200, stats: Optional[AnalysisStats] = None) -> tuple:
+    """
+    Score a single text.
+
+    Returns the per-row columns of ``_result_schema`` as a tuple, plus the
+    matched concept ids and their counts for batch category aggregation.
+    With a ``DictionarySet`` the text is tokenized once and each dictionary
+    is matched against the same cleaned tokens.
+    """
+    capture = {"full": "text", "truncate": "text", "offsets": "offsets"}.get(text_output)
+    members = list(_dictionary_members(dict_data))
+    if len(text) >= WINDOW_MIN_CHARS:
+        wc, tc_raw, tc_clean, types_raw, types_clean, matchers = score_windowed(
+            text, tokenizer, stop_remover, [member for _, member, _ in members], whitespace_method, capture,
+            truncate_chars if text_output == "truncate" else None, stats)
+        matches = [(matcher.concept_counts, matcher.num_matched_tokens, matcher.captured, matcher.nonmatched_count,
+                    len(matcher.nonmatched_types)) for matcher in matchers]
+        if capture == "text":
+            matches = [match[:2] + (' '.join(match[2]),) + match[3:] for match in matches]
+    else:
+        if stats is not None:
+            wc, words_raw, words_clean = _profiled_tokenize(text, tokenizer, stop_remover, whitespace_method, stats)
+            tc_raw, types_raw, types_clean = len(words_raw), len(set(words_raw)), len(set(words_clean))
+        elif len(text) >= INTERN_MIN_CHARS:
+            wc = count_whitespace_words(text, whitespace_method)
+            ids, clean_ids, words_clean = tokenizer.tokenize_ids(text, stop_remover.vocabulary)
+            tc_raw, types_raw, types_clean = len(ids), count_unique(ids), count_unique(clean_ids)
+        else:
+            wc, words_raw, words_clean = tokenizer.tokenize_for_analysis(text, stop_remover.stopwords,
+                                                                         whitespace_method)
+            tc_raw, types_raw, types_clean = len(words_raw), len(set(words_raw)), len(set(words_clean))
+        tc_clean = len(words_clean)
+        matches = []
+        for _, member, _ in members:
+            started = perf_counter() if stats is not None else 0.0
+            concept_counts, num_matched_tokens, captured, nonmatched = match_dictionary(member, words_clean, capture)
+            if stats is not None:
+                stats.add("match", perf_counter() - started)
+            matches.append((concept_counts, num_matched_tokens, captured, len(nonmatched), len(set(nonmatched))))
+
+    ttr_raw = (types_raw / tc_raw * 100) if tc_raw else 0
+
+    ttr_clean = (types_clean / tc_clean * 100) if tc_clean else 0
+
+    row = [filename]
+    if text_output == "truncate":
+        text = text[:truncate_chars]
+    if text_output in ("full", "truncate"):
+        row.append(text)
+    row += [wc, tc_raw, round(ttr_raw, 5), tc_clean, round(ttr_clean, 5)]
+
+    concept_ids, counts = [], []
+    for (_, member, offset), (concept_counts, num_matched_tokens, captured, tc_nondict, types_nondict) \
+            in zip(members, matches):
+        ttr_nondict = (types_nondict / tc_nondict * 100) if tc_nondict else 0
+        dict_percent = (num_matched_tokens / tc_raw * 100) if tc_raw else 0
+        row += [tc_nondict, round(ttr_nondict, 5), round(dict_percent, 5)]
+        if text_output == "truncate":
+            row.append(captured[:truncate_chars])
+        elif text_output == "full":
+            row.append(captured)
+        elif text_output == "offsets":
+            row.append(' '.join(f"{start}:{end}" for start, end in captured))
+
+        # Category metrics are computed per batch in _ResultColumns, from concept ids and counts
+        concept_index = member.concept_index
+        concept_ids += [concept_index[concept] + offset for concept in concept_counts if concept in concept_index]
+        counts += [count for concept, count in concept_counts.items() if concept in concept_index]
+    return tuple(row), concept_ids, counts
+
+def _profiled_tokenize(text, tokenizer, stop_remover, whitespace_method, stats: AnalysisStats):
+    """The steps of ``tokenize_for_analysis`` run one at a time, each timed into ``stats``."""
+    t0 = perf_counter()
+    wc = count_whitespace_words(text, whitespace_method)
+    t1 = perf_counter()
+    words_raw = tokenizer.tokenize(text)
+    t2 = perf_counter()
+    stopwords = stop_remover.stopwords
+    words_clean = remove_stopwords(words_raw, stopwords)
+    t3 = perf_counter()
+    stats.add("whitespace_count", t1 - t0)
+    stats.add("tokenize", t2 - t1)
+    stats.add("stopwords", t3 - t2)
+    stats.add_text(len(words_raw))
+    return wc, words_raw, words_clean
+
+def _round5(values: np.ndarray) -> np.ndarray:
+    """Vectorized ``round(x, 5)`` that agrees with Python's correctly-rounded ``round`` exactly."""
+    rounded = np.round(values, 5)
+    # np.round scales by 1e5 and can land on the other side of a .5 tie; defer those few to Python
+    scaled = values * 1e5
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) <= np.abs(scaled) * 1e-12 + 1e-9)
+    for i in ties:
+        rounded[i] = round(float(values[i]), 5)
+    return rounded
+
+def _category_metrics(dict_data: DictionaryData, n_docs: int, doc_ids: np.ndarray, concept_ids: np.ndarray,
+                      counts: np.ndarray, wc: np.ndarray) -> dict:
+    """
+    Compute every category column for a batch at once.
+
+    (doc_ids, concept_ids, counts) is a sparse document x concept count
+    matrix in COO form. Multiplying it by the dictionary's concept x category
+    indicator matrix gives total counts per category, and the same product on
+    the matrix's sparsity pattern gives unique concept counts.
+    """
+    num_cats = dict_data.num_cats
+    indptr = np.frombuffer(dict_data.concept_category_indptr, dtype=np.int64)
+    indices = np.frombuffer(dict_data.concept_category_indices, dtype=np.int64)
+
+    # Expand each (doc, concept) entry into one (doc, category) entry per category of the concept
+    starts = indptr[concept_ids]
+    lengths = indptr[concept_ids + 1] - starts
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    categories = indices[np.repeat(starts, lengths) + offsets]
+    cells = np.repeat(doc_ids, lengths) * num_cats + categories
+
+    size = n_docs * num_cats
+    unique = np.bincount(cells, minlength=size).reshape(n_docs, num_cats)
+    total = np.bincount(cells, weights=np.repeat(counts, lengths), minlength=size)
+    total = total.astype(np.int64).reshape(n_docs, num_cats)
+
+    wc = wc[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cwr = np.where(wc > 0, _round5((unique / wc * 100).ravel()).reshape(unique.shape), 0.0)
+        ccr = np.where(total > 0, _round5((unique / total * 100).ravel()).reshape(unique.shape), 0.0)
+
+    columns = {}
+    for i, cat in enumerate(dict_data.cat_names):
+        columns[f"{cat}_CWR"] = cwr[:, i]
+        columns[f"{cat}_CCR"] = ccr[:, i]
+        if dict_data.raw_word_counts:
+            columns[f"{cat}_Count"] = total[:, i]
+            columns[f"{cat}_Unique"] = unique[:, i]
+    return columns
+
+class _ResultColumns:
+    """
+    Preallocated, typed NumPy columns that result rows are written into as they arrive.
+
+    Per-row metrics are written in place; concept counts are collected as a
+    sparse document x concept matrix and turned into category columns for
+    the whole batch in ``to_frame``.
+    """
+
+    def __init__(self, schema: dict, dict_data: DictionaryData, size: int, stats: Optional[AnalysisStats] = None):
+        self.dict_data = dict_data
+        self.stats = stats
+        self.names = list(schema)
+        num_category_columns = len(dict_data.cat_names) * (4 if dict_data.raw_word_counts else 2)
+        self.row_names = self.names[:len(self.names) - num_category_columns]
+        self.arrays = [np.empty(size, dtype=schema[name]) for name in self.row_names]
+        self.doc_ids = array('q')
+        self.concept_ids = array('q')
+        self.counts = array('q')
+        self.size = 0
+
+    def append(self, result: tuple):
+        row, concept_ids, counts = result
+        for column, value in zip(self.arrays, row):
+            column[self.size] = value
+        self.doc_ids.extend([self.size] * len(concept_ids))
+        self.concept_ids.extend(concept_ids)
+        self.counts.extend(counts)
+        self.size += 1
+
+    def to_columns(self) -> dict:
+        """All result columns as NumPy arrays, in schema order."""
+        started = perf_counter()
+        data = {name: column[:self.size] for name, column in zip(self.row_names, self.arrays)}
+        data.update(_category_metrics(
+            self.dict_data, self.size,
+            np.frombuffer(self.doc_ids, dtype=np.int64),
+            np.frombuffer(self.concept_ids, dtype=np.int64),
+            np.frombuffer(self.counts, dtype=np.int64),
+            data["WC"]))
+        if self.stats is not None:
+            self.stats.add("aggregate", perf_counter() - started)
+        return data
+
+    def to_records(self) -> List[dict]:
+        """One plain dict of native Python values per row."""
+        data = self.to_columns()
+        values = [data[name].tolist() for name in self.names]
+        return [dict(zip(self.names, row)) for row in zip(*values)]
+
+    def to_frame(self):
+        """The batch as a pandas DataFrame."""
+        import pandas as pd
+        return pd.DataFrame(self.to_columns(), columns=self.names)
+
+def _relabel(result: tuple, filename: str) -> tuple:
+    row, concept_ids, counts = result
+    return (filename,) + row[1:], concept_ids, counts
@@ -0,0 +1,493 @@
+"""
+Sharded batch runs: split a corpus into shards, score them on independent workers, merge the results
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .checkpoint import file_fingerprint, text_fingerprint
+from .dictionary import dictionary_cache_key
+from .ingest import DocumentReader, find_sources
+from .scoring import _named_dictionaries
+from .stopwords import load_stopwords_from_file
+from .writers import WRITERS, merge_results, writer_class
+
+# run_vocabulate_analysis arguments the runner sets itself for each shard
+_RESERVED_OPTIONS = ("input_data", "text_column", "recursive", "output_csv", "output_file", "output_format",
+                     "checkpoint_dir")
+
+class Shard:
+    """A contiguous run of source files, scored as one unit."""
+
+    def __init__(self, index: int, sources: List[str], size: int = 0):
+        self.index = index
+        self.sources = sources
+        self.size = size
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "sources": self.sources, "size": self.size}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Shard":
+        return cls(data["index"], data["sources"], data["size"])
+
+    def __repr__(self):
+        return f"Shard(index={self.index}, files={len(self.sources)}, size={self.size})"
+
+def plan_shards(sources: Sequence[Path], num_shards: Optional[int] = None,
+                shard_bytes: Optional[int] = None) -> List[Shard]:
+    """
+    Split ``sources`` into contiguous shards of roughly equal size on disk.
+
+    Shards keep the order of ``sources``, so concatenating shard results in
+    shard order gives the same row order as scoring the sources in one run.
+    Give either ``num_shards`` (at most that many shards are made) or
+    ``shard_bytes`` (a new shard starts once a shard holds that many bytes).
+    Files are never split, so one large file is one shard.
+    """
+    if (num_shards is None) == (shard_bytes is None):
+        raise ValueError("Give exactly one of num_shards or shard_bytes.")
+    if (num_shards is not None and num_shards < 1) or (shard_bytes is not None and shard_bytes < 1):
+        raise ValueError("num_shards and shard_bytes must be at least 1.")
+    sources = [Path(path) for path in sources]
+    sizes = [path.stat().st_size for path in sources]
+    total = sum(sizes)
+
+    groups: List[List[int]] = []
+    if shard_bytes is not None:
+        held = 0
+        for i, size in enumerate(sizes):
+            if not groups or (held and held + size > shard_bytes):
+                groups.append([])
+                held = 0
+            groups[-1].append(i)
+            held += size
+    else:
+        # Each file goes to the shard its size-weighted midpoint falls in
+        before = 0
+        buckets: Dict[int, List[int]] = {}
+        for i, size in enumerate(sizes):
+            position = (before + size / 2) / total if total else (i + 0.5) / len(sizes)
+            buckets.setdefault(min(num_shards - 1, int(position * num_shards)), []).append(i)
+            before += size
+        groups = [buckets[k] for k in sorted(buckets)]
+
+    return [Shard(index, [str(sources[i]) for i in group], sum(sizes[i] for i in group))
+            for index, group in enumerate(groups)]
+
+class ShardedJob:
+    """
+    Everything a worker needs to score one shard of a sharded run.
+
+    Parameters:
+    -----------
+    work_dir : str or Path
+        Holds per-shard outputs and checkpoints; must be reachable by every worker.
+    options : dict
+        Keyword arguments for ``run_vocabulate_analysis`` (dict_file,
+        stopwords_file, text_output, ...).
+    output_format : str
+        Format of shard outputs, as accepted by ``writers.writer_class``.
+    root : str, optional
+        Ids are paths relative to ``root``; file names if None.
+    reader_options : dict, optional
+        ``DocumentReader`` options (encoding, text_field, id_field).
+    """
+
+    def __init__(self, work_dir, options: dict, output_format: str, root: Optional[str] = None,
+                 reader_options: Optional[dict] = None):
+        reserved = sorted(set(options) & set(_RESERVED_OPTIONS))
+        if reserved:
+            raise ValueError(f"These options are set per shard and cannot be passed: {reserved}")
+        self.work_dir = Path(work_dir)
+        self.options = options
+        self.output_format = output_format
+        self.root = root
+        self.reader_options = reader_options or {}
+
+    def shard_path(self, index: int) -> Path:
+        return self.work_dir / "shards" / f"shard-{index:06d}.{self.output_format}"
+
+    def checkpoint_dir(self, index: int) -> Path:
+        return self.work_dir / "checkpoints" / f"shard-{index:06d}"
+
+    def to_dict(self) -> dict:
+        return {"work_dir": str(self.work_dir), "options": self.options, "output_format": self.output_format,
+                "root": self.root, "reader_options": self.reader_options}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ShardedJob":
+        return cls(data["work_dir"], data["options"], data["output_format"], data["root"], data["reader_options"])
+
+def run_shard(job: ShardedJob, shard: Shard) -> str:
+    """
+    Score one shard into ``job.shard_path(shard.index)``.
+
+    The output appears under its final name only once complete, so a shard
+    whose output exists is done and is not scored again. Each shard keeps a
+    checkpoint, so a retried shard only scores the texts its failed attempt
+    did not finish.
+    """
+    from .core import run_vocabulate_analysis
+
+    final = job.shard_path(shard.index)
+    if final.exists():
+        return str(final)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    partial = final.with_name(final.name + ".partial")
+    reader = DocumentReader([Path(path) for path in shard.sources],
+                            root=Path(job.root) if job.root is not None else None, **job.reader_options)
+    run_vocabulate_analysis(input_data=reader, output_file=str(partial), output_format=job.output_format,
+                            checkpoint_dir=str(job.checkpoint_dir(shard.index)), **job.options)
+    os.replace(partial, final)
+    return str(final)
+
+# ------------------- Backends -------------------
+class ShardBackend:
+    """
+    Runs shards somewhere. ``run`` scores each shard with ``run_shard`` and
+    returns an error message for every shard that failed; the runner retries
+    those.
+    """
+
+    def run(self, job: ShardedJob, shards: List[Shard]) -> Dict[int, str]:
+        raise NotImplementedError
+
+class LocalBackend(ShardBackend):
+    """Scores shards in a pool of ``workers`` local processes (-1 uses every core)."""
+
+    def __init__(self, workers: int = -1):
+        self.workers = max(1, os.cpu_count() or 1) if workers == -1 else max(1, workers)
+
+    def run(self, job: ShardedJob, shards: List[Shard]) -> Dict[int, str]:
+        failures = {}
+        # A worker that dies breaks the pool; the shards it took down are retried in a fresh one
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(shards))) as executor:
+            futures = {executor.submit(run_shard, job, shard): shard for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[futures[future].index] = f"{type(e).__name__}: {e}"
+        return failures
+
+class FileQueueBackend(ShardBackend):
+    """
+    Hands shards to workers through a queue directory on a shared filesystem.
+
+    Each shard is a JSON task file in ``pending/``. A worker claims a task
+    by renaming it into ``running/`` (only one rename can win), keeps it
+    fresh while scoring, and moves it to ``done/`` or ``failed/``. A task
+    whose worker stops refreshing it for ``lease_timeout`` seconds counts as
+    failed, so a crashed worker's shard is retried.
+
+    Workers are ``python -m lemo_vocabulate.sharding worker QUEUE_DIR``
+    processes, started by hand (any number, on any machine that sees the
+    queue and the work directory) or, with ``workers`` > 0, by the backend
+    itself for the duration of ``run``.
+    """
+
+    def __init__(self, queue_dir, workers: int = 0, lease_timeout: float = 120.0, poll_interval: float = 0.5):
+        self.queue_dir = Path(queue_dir)
+        self.workers = workers
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+
+    def run(self, job: ShardedJob, shards: List[Shard]) -> Dict[int, str]:
+        job_data = job.to_dict()
+        try:
+            json.dumps(job_data)
+        except TypeError as e:
+            raise ValueError(f"FileQueueBackend needs JSON-serializable analysis options: {e}")
+        for name in ("pending", "running", "done", "failed"):
+            (self.queue_dir / name).mkdir(parents=True, exist_ok=True)
+        (self.queue_dir / "stop").unlink(missing_ok=True)
+
+        batch = uuid.uuid4().hex[:8]
+        waiting = {}
+        for shard in shards:
+            name = f"{batch}-shard-{shard.index:06d}.json"
+            _write_json(self.queue_dir / "pending" / name, {"job": job_data, "shard": shard.to_dict()})
+            waiting[name] = shard.index
+
+        # Workers import this same copy of the package, installed or not
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        processes = [subprocess.Popen([sys.executable, "-m", "lemo_vocabulate.sharding", "worker",
+                                       str(self.queue_dir), "--poll-interval", str(self.poll_interval)], env=env)
+                     for _ in range(self.workers)]
+        failures = {}
+        try:
+            while waiting:
+                for name in list(waiting):
+                    if (self.queue_dir / "done" / name).exists():
+                        del waiting[name]
+                    elif (self.queue_dir / "failed" / name).exists():
+                        task = _read_json(self.queue_dir / "failed" / name)
+                        failures[waiting.pop(name)] = task.get("error", "failed")
+                    else:
+                        self._expire(name)
+                if waiting:
+                    if processes and all(process.poll() is not None for process in processes):
+                        raise RuntimeError("All queue workers exited before their shards were done.")
+                    time.sleep(self.poll_interval)
+        finally:
+            if processes:
+                (self.queue_dir / "stop").touch()
+                for process in processes:
+                    process.wait()
+        return failures
+
+    def _expire(self, name: str):
+        running = self.queue_dir / "running" / name
+        try:
+            if time.time() - running.stat().st_mtime <= self.lease_timeout:
+                return
+            task = _read_json(running)
+            task["error"] = f"worker lease expired after {self.lease_timeout:g}s"
+            _write_json(self.queue_dir / "failed" / name, task)
+            running.unlink()
+        except FileNotFoundError:
+            pass
+
+def run_queue_worker(queue_dir, poll_interval: float = 0.5, heartbeat: float = 10.0,
+                     idle_timeout: Optional[float] = None) -> int:
+    """
+    Claim and score tasks from a ``FileQueueBackend`` queue until told to stop.
+
+    Stops when a ``stop`` file appears in the queue directory or, if
+    ``idle_timeout`` is set, after that many seconds without work. Returns
+    the number of tasks processed.
+    """
+    queue_dir = Path(queue_dir)
+    processed = 0
+    idle_since = time.time()
+    while not (queue_dir / "stop").exists():
+        task_path = _claim(queue_dir)
+        if task_path is None:
+            if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stop_heartbeat = threading.Event()
+        beating = threading.Thread(target=_heartbeat, args=(task_path, heartbeat, stop_heartbeat), daemon=True)
+        beating.start()
+        task = _read_json(task_path)
+        try:
+            run_shard(ShardedJob.from_dict(task["job"]), Shard.from_dict(task["shard"]))
+            outcome = "done"
+        except Exception:
+            task["error"] = traceback.format_exc(limit=5)
+            outcome = "failed"
+        finally:
+            stop_heartbeat.set()
+            beating.join()
+        # The coordinator may have expired the lease meanwhile; its verdict stands
+        if task_path.exists():
+            _write_json(queue_dir / outcome / task_path.name, task)
+            task_path.unlink(missing_ok=True)
+        processed += 1
+        idle_since = time.time()
+    return processed
+
+def _claim(queue_dir: Path) -> Optional[Path]:
+    for task in sorted((queue_dir / "pending").glob("*.json")):
+        target = queue_dir / "running" / task.name
+        try:
+            os.rename(task, target)
+        except FileNotFoundError:
+            continue    # Claimed by another worker first
+        os.utime(target)
+        return target
+    return None
+
+def _heartbeat(path: Path, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+def _read_json(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path: Path, data: dict):
+    # Written under a temporary name, so readers never see a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+# ------------------- Runner -------------------
+def run_sharded(
+    corpus,
+    output_file: str,
+    work_dir: str,
+    num_shards: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+    backend: Optional[ShardBackend] = None,
+    retries: int = 2,
+    retry_delay: float = 1.0,
+    recursive: bool = False,
+    output_format: Optional[str] = None,
+    text_field: str = "text",
+    id_field: Optional[str] = None,
+    **options
+) -> str:
+    """
+    Score a corpus of files in shards on independent workers and merge the results.
+
+    The corpus is split into contiguous shards (see ``plan_shards``), each
+    scored by ``run_vocabulate_analysis`` into its own output file under
+    ``work_dir``, and the shard outputs are concatenated in shard order into
+    ``output_file``. The merged file has the same rows, in the same order,
+    as a single ``run_vocabulate_analysis`` call over the corpus.
+
+    Shards that fail are retried up to ``retries`` more times, resuming from
+    their checkpoints. Re-running the same call after an interruption only
+    scores shards that are not finished. Changing the corpus, the options or
+    the contents of the dictionary or stopwords files rescores every shard,
+    but each shard's checkpoint still skips texts that are unchanged.
+
+    Parameters:
+    -----------
+    corpus : str, Path or list of paths
+        A folder (searched recursively if ``recursive``, with ids relative
+        to it), or an explicit list of files (ids are file names). Supported
+        files are as for ``iter_texts``.
+    output_file : str
+        Merged output; Parquet, Feather or CSV by suffix or ``output_format``.
+    work_dir : str
+        Shard outputs, checkpoints and the shard plan. Must be visible to all workers.
+    num_shards, shard_bytes : int, optional
+        How to split the corpus; defaults to one shard per worker of a
+        ``LocalBackend``, or four per CPU otherwise.
+    backend : ShardBackend, optional
+        Where shards run; a ``LocalBackend`` using every core if None.
+    retries, retry_delay :
+        Extra attempts for failed shards, and seconds to wait before each
+        round of retries (multiplied by the attempt number).
+    text_field, id_field : str
+        JSON Lines keys, as for ``iter_texts``.
+    **options :
+        Passed to ``run_vocabulate_analysis`` for every shard (dict_file,
+        stopwords_file, text_output, n_jobs, ...).
+
+    Returns:
+    --------
+    str : The path of the merged output file.
+
+    Examples:
+    ---------
+    >>> run_sharded("corpus/", "results.parquet", "work/", num_shards=32,
+    ...             backend=FileQueueBackend("queue/", workers=8),
+    ...             dict_file=get_data_path("AEV_Dict.csv"), stopwords_file=get_data_path("stopwords.txt"))
+    """
+    backend = backend if backend is not None else LocalBackend()
+    if isinstance(corpus, (str, Path)):
+        root = Path(corpus)
+        if not root.is_dir():
+            raise ValueError(f"corpus must be a folder or a list of files, got: {corpus}")
+        sources = find_sources(root, recursive)
+        job_root = str(root) if recursive else None
+    else:
+        sources = [Path(path) for path in corpus]
+        missing = [str(path) for path in sources if not path.is_file()]
+        if missing:
+            raise ValueError(f"Corpus files not found: {missing[:5]}")
+        job_root = None
+    if not sources:
+        raise ValueError(f"No .txt or .jsonl files (optionally .gz/.zst) found in corpus: {corpus}")
+    if num_shards is None and shard_bytes is None:
+        num_shards = backend.workers if isinstance(backend, LocalBackend) else 4 * (os.cpu_count() or 1)
+
+    writer_class(output_file, output_format)
+    # Shards are written in the output's format, so merging is a plain concatenation
+    shard_format = (output_format or Path(output_file).suffix).lower().lstrip(".")
+    if "." + shard_format not in WRITERS:
+        shard_format = "csv"
+    reader_options = {"encoding": options.get("encoding", "utf-8"), "text_field": text_field, "id_field": id_field}
+    job = ShardedJob(work_dir, options, shard_format, job_root, reader_options)
+    shards = _load_plan(job, sources, num_shards, shard_bytes)
+
+    pending = [shard for shard in shards if not job.shard_path(shard.index).exists()]
+    if len(pending) < len(shards):
+        print(f"♻️ {len(shards) - len(pending)} of {len(shards)} shard(s) already done in {work_dir}")
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt:
+            time.sleep(retry_delay * attempt)
+            print(f"🔁 Retrying {len(pending)} failed shard(s) (attempt {attempt + 1} of {retries + 1})")
+        else:
+            print(f"🧩 Scoring {len(pending)} shard(s) with {type(backend).__name__}...")
+        failures = backend.run(job, pending)
+        pending = [shard for shard in pending if shard.index in failures or not job.shard_path(shard.index).exists()]
+    if pending:
+        details = "\n".join(f"  shard {shard.index}: {failures.get(shard.index, 'no output')}" for shard in pending)
+        raise RuntimeError(f"{len(pending)} shard(s) failed after {retries + 1} attempt(s):\n{details}")
+
+    merge_results([job.shard_path(shard.index) for shard in shards], output_file, output_format)
+    print(f"✅ Merged {len(shards)} shard(s) into {output_file}")
+    return str(output_file)
+
+def _load_plan(job: ShardedJob, sources: List[Path], num_shards: Optional[int],
+               shard_bytes: Optional[int]) -> List[Shard]:
+    """The shard plan, reusing finished shards only if the corpus, options and word lists are unchanged since they were made."""
+    plan_path = job.work_dir / "plan.json"
+    settings = {"job": job.to_dict(), "num_shards": num_shards, "shard_bytes": shard_bytes,
+                "sources": [[str(path), file_fingerprint(path)] for path in sources],
+                "content": _content_keys(job.options)}
+    settings = json.loads(json.dumps(settings, default=str))
+    if plan_path.exists():
+        plan = _read_json(plan_path)
+        if plan["settings"] == settings:
+            return [Shard.from_dict(shard) for shard in plan["shards"]]
+        # Shard outputs are stale; checkpoints are kept, as they check each text themselves
+        shutil.rmtree(job.work_dir / "shards", ignore_errors=True)
+    shards = plan_shards(sources, num_shards, shard_bytes)
+    job.work_dir.mkdir(parents=True, exist_ok=True)
+    _write_json(plan_path, {"settings": settings, "shards": [shard.to_dict() for shard in shards]})
+    return shards
+
+def _content_keys(options: dict) -> dict:
+    """Content hashes of the dictionaries and stoplist, keyed as in the ``run_vocabulate_analysis`` checkpoint."""
+    encoding = options.get("encoding", "utf-8")
+    dict_file = options.get("dict_file")
+    dictionaries = []
+    if dict_file:
+        dictionaries = [[namespace, dictionary_cache_key(path, encoding, options.get("csv_delimiter", ","),
+                                                         options.get("csv_quote", '"'))]
+                        for namespace, path in _named_dictionaries(dict_file) or [("", dict_file)]]
+    stopwords_text = options.get("stopwords_text")
+    if options.get("stopwords_file"):
+        stopwords_text = load_stopwords_from_file(options["stopwords_file"], encoding)
+    return {"dictionary": dictionaries, "stopwords": text_fingerprint(stopwords_text or "")}
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m lemo_vocabulate.sharding",
+                                     description="Run a worker for a FileQueueBackend queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="Claim and score shard tasks from a queue directory.")
+    worker.add_argument("queue_dir")
+    worker.add_argument("--poll-interval", type=float, default=0.5)
+    worker.add_argument("--heartbeat", type=float, default=10.0,
+                        help="Seconds between lease refreshes; keep well below the coordinator's lease_timeout.")
+    worker.add_argument("--idle-timeout", type=float, help="Exit after this many seconds without work.")
+    args = parser.parse_args(argv)
+    run_queue_worker(args.queue_dir, args.poll_interval, args.heartbeat, args.idle_timeout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main())
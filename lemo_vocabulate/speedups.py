@@ -0,0 +1,44 @@
+"""
+Selection of the compiled or pure-Python hot loops
+
+``_speedups`` is plain Python that setup.py also compiles with Cython when
+it can. Python imports the compiled extension in preference to the source
+file, so installs with a compiled build use it automatically and all others
+fall back to the identical pure-Python functions. Set the environment
+variable ``LEMO_VOCABULATE_PURE_PYTHON=1`` to force the pure-Python version.
+"""
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+
+def load(pure: bool = False) -> ModuleType:
+    """The compiled ``_speedups`` module if available (and not ``pure``), else its pure-Python source."""
+    if not pure:
+        from . import _speedups
+        return _speedups
+    name = f"{__package__}._speedups_py"
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, Path(__file__).with_name("_speedups.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[name] = module
+    return module
+
+def is_compiled(module: ModuleType) -> bool:
+    return not module.__file__.endswith(".py")
+
+kernels = load(pure=os.environ.get("LEMO_VOCABULATE_PURE_PYTHON", "") not in ("", "0"))
+COMPILED = is_compiled(kernels)
+
+match_tokens = kernels.match_tokens
+match_span = kernels.match_span
+wildcard_lookup = kernels.wildcard_lookup
+wildcard_lookup_token = kernels.wildcard_lookup_token
+walk_token = kernels.walk_token
+lowercase_tokens = kernels.lowercase_tokens
+remove_stopwords = kernels.remove_stopwords
+count_split_words = kernels.count_split_words
+CAPTURE_MODES = {None: kernels.CAPTURE_NONE, "text": kernels.CAPTURE_TEXT, "offsets": kernels.CAPTURE_OFFSETS}
@@ -5,15 +5,20 @@ Stopword handling utilities
 from pathlib import Path
 from typing import List, Set
 
+from .speedups import remove_stopwords
+from .vocab import TokenVocabulary
+
 class StopWordRemover:
     def __init__(self):
         self.stopwords: Set[str] = set()
+        self.vocabulary = TokenVocabulary(self.stopwords)
 
     def build_stoplist(self, stoplist_text: str):
         self.stopwords = {word.strip().lower() for word in stoplist_text.split('\n') if word.strip()}
+        self.vocabulary = TokenVocabulary(self.stopwords)
 
     def clear_stopwords(self, words: List[str]) -> List[str]:
-        return [word for word in words if word not in self.stopwords]
+        return remove_stopwords(words if isinstance(words, list) else list(words), self.stopwords, drop_empty=False)
     
     # ------------------- Load Stopwords -------------------
 def load_stopwords_from_file(file_path: str, encoding: str = "utf-8") -> str:
@@ -2,7 +2,11 @@
 Tokenization utilities for text processing
 """
 import re
-from typing import List
+from typing import List, Set, Tuple
+import numpy as np
+
+from .speedups import count_split_words, lowercase_tokens, remove_stopwords
+from .vocab import TokenVocabulary
 
 # ------------------- Tokenizer -------------------
 class TwitterAwareTokenizer:
@@ -34,14 +38,52 @@ class TwitterAwareTokenizer:
         return self.reduce_lengthening_re.sub(r'\1\1\1', text)
 
     def tokenize(self, text: str, reduce_len: bool = True, preserve_case: bool = False) -> List[str]:
-        if reduce_len:
-            text = self.reduce_lengthening(text)
-        safe_text = self.hang_re.sub(r'\1\1\1', text)
-        words = self.word_re.findall(safe_text)
+        words = self._find_words(text, reduce_len)
         if not preserve_case:
-            words = [w if self.emoticon_re.match(w) else w.lower() for w in words]
+            words = self._lowercase(words)
         return words
 
+    def tokenize_ids(self, text: str, vocabulary: TokenVocabulary) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        ``tokenize`` into interned token ids; see ``TokenVocabulary.encode``.
+
+        Returns the ids of all tokens, the ids of non-stopword tokens, and the
+        non-stopword tokens as shared strings. Only tokens new to the
+        vocabulary are lowercased.
+        """
+        return vocabulary.encode(self._find_words(text, True), self._lowercase)
+
+    def _find_words(self, text: str, reduce_len: bool) -> List[str]:
+        if reduce_len:
+            safe_text = self.reduce_lengthening(text)
+            # reduce_lengthening_re's '.' skips newlines, so after it hang_re can
+            # only match runs of 4+ '\n'; without a newline its pass is skipped
+            if '\n' in safe_text:
+                safe_text = self.hang_re.sub(r'\1\1\1', safe_text)
+        else:
+            safe_text = self.hang_re.sub(r'\1\1\1', text)
+        return self.word_re.findall(safe_text)
+
+    def _lowercase(self, words: List[str]) -> List[str]:
+        # Emoticons keep their case. Only tokens that lowercasing would change
+        # need the emoticon check, which skips the regex for most tokens.
+        return lowercase_tokens(words, self.emoticon_re.match)
+
+    def tokenize_for_analysis(self, text: str, stopwords: Set[str],
+                              whitespace_method: str = 'new') -> Tuple[int, List[str], List[str]]:
+        """
+        Produce everything the analysis needs from a text in one call.
+
+        Returns the whitespace word count, the raw tokens, and the tokens with
+        stopwords removed. Identical to ``len(tokenize_whitespace(...))``,
+        ``tokenize(...)`` and ``StopWordRemover.clear_stopwords(...)``, but
+        without building the whitespace token list or a second token list.
+        """
+        wc = count_whitespace_words(text, whitespace_method)
+        words_raw = self.tokenize(text)
+        words_clean = remove_stopwords(words_raw, stopwords)
+        return wc, words_raw, words_clean
+
 # ------------------- Whitespace Tokenizer -------------------
 def tokenize_whitespace(text: str, method: str = 'new') -> list:
     """
@@ -63,3 +105,14 @@ def tokenize_whitespace(text: str, method: str = 'new') -> list:
         return final_tokens
     else:
         raise ValueError("Invalid method. Choose 'old' or 'new'.")
+
+
+def count_whitespace_words(text: str, method: str = 'new') -> int:
+    """Equivalent to ``len(tokenize_whitespace(text, method))`` without building the token list."""
+    method = method.lower()
+    if method == 'old':
+        return len(str(text).split())
+    elif method == 'new':
+        return count_split_words(str(text))
+    else:
+        raise ValueError("Invalid method. Choose 'old' or 'new'.")
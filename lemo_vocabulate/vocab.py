@@ -0,0 +1,98 @@
+"""
+Token interning: dense integer ids for tokens, shared across documents
+"""
+import threading
+from typing import Callable, FrozenSet, List, Set, Tuple, Union
+import numpy as np
+
+class _State:
+    __slots__ = ("raw", "ids", "tokens", "keep")
+
+    def __init__(self):
+        self.raw = {}                           # token as matched in the text -> id of its normalized form
+        self.ids = {}                           # normalized token -> id
+        self.tokens = []                        # id -> normalized token
+        self.keep = np.zeros(1024, dtype=bool)  # id -> neither empty nor a stopword
+
+class TokenVocabulary:
+    """
+    Maps tokens to dense int32 ids so a document's token stream is a compact
+    NumPy array instead of a list of fresh string objects.
+
+    Each distinct token is stored (and lowercased) once, and the strings
+    handed on to dictionary matching are the shared, interned copies with
+    their hashes already cached. Stopword status is a boolean per id, so
+    stopword filtering and type counting are array operations.
+
+    Ids are only meaningful within one ``encode`` call: once the vocabulary
+    holds more than ``max_size`` tokens it starts afresh, which bounds its
+    memory on open-ended social-media vocabularies. It is safe to share
+    between threads.
+    """
+
+    def __init__(self, stopwords: Union[Set[str], FrozenSet[str]] = frozenset(), max_size: int = 1000000):
+        self.stopwords = stopwords
+        self.max_size = max_size
+        self._state = _State()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state.tokens)
+
+    def __getstate__(self):
+        return {"stopwords": self.stopwords, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["stopwords"], state["max_size"])
+
+    def encode(self, words: List[str],
+               normalize: Callable[[List[str]], List[str]]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Intern the tokens of one document.
+
+        ``normalize`` maps raw tokens to their final form (e.g. the
+        tokenizer's lowercasing) and is only called for tokens not seen
+        before. Returns the ids of all tokens, the ids of the tokens that are
+        neither empty nor stopwords, and those tokens as interned strings.
+        """
+        state = self._state
+        try:
+            ids = np.fromiter(map(state.raw.__getitem__, words), dtype=np.int32, count=len(words))
+        except KeyError:
+            with self._lock:
+                if len(self._state.tokens) > self.max_size:
+                    self._state = _State()
+                state = self._state
+                self._add(state, words, normalize)
+            ids = np.fromiter(map(state.raw.__getitem__, words), dtype=np.int32, count=len(words))
+        clean_ids = ids[state.keep[ids]]
+        return ids, clean_ids, list(map(state.tokens.__getitem__, clean_ids.tolist()))
+
+    def _add(self, state: _State, words: List[str], normalize: Callable[[List[str]], List[str]]):
+        # encode's lock-free readers trust any id found in state.raw, so each new
+        # token and its keep flag are in place before its raw entry is published
+        missing = [word for word in dict.fromkeys(words) if word not in state.raw]
+        first_new = len(state.tokens)
+        new_ids = []
+        for form in normalize(missing):
+            token_id = state.ids.get(form)
+            if token_id is None:
+                token_id = state.ids[form] = len(state.tokens)
+                state.tokens.append(form)
+            new_ids.append(token_id)
+
+        size = len(state.tokens)
+        keep = state.keep
+        if size > len(keep):
+            keep = np.zeros(max(size, 2 * len(keep)), dtype=bool)
+            keep[:first_new] = state.keep[:first_new]
+        stopwords = self.stopwords
+        for token_id in range(first_new, size):
+            token = state.tokens[token_id]
+            keep[token_id] = bool(token) and token not in stopwords
+        state.keep = keep
+        state.raw.update(zip(missing, new_ids))
+
+def count_unique(ids: np.ndarray) -> int:
+    """Number of distinct ids."""
+    return int(np.unique(ids).size)
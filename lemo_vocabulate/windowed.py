@@ -0,0 +1,138 @@
+"""
+Windowed scoring of very long texts in bounded memory
+
+A text is cut into chunks of about ``WINDOW_CHARS`` characters at points no
+token can span, each chunk is tokenized on its own, and its tokens are
+matched against the dictionaries as they arrive. Token and type counts are
+kept as running totals and sets of distinct tokens, so memory grows with the
+chunk size and the vocabulary instead of with the document. The results are
+exactly those of tokenizing and matching the whole text at once.
+"""
+import re
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .dictionary import DictionaryData
+from .profiling import AnalysisStats
+from .speedups import CAPTURE_MODES, match_span, remove_stopwords
+from .stopwords import StopWordRemover
+from .tokenizer import TwitterAwareTokenizer, count_whitespace_words
+
+# Characters per chunk; scoring.WINDOW_MIN_CHARS decides which texts are windowed
+WINDOW_CHARS = 1 << 20
+
+# Chunks end where a whitespace run starts after a character other than '.'. Only the
+# "..." pattern matches across whitespace, and lengthening runs never cross it, so
+# tokenizing chunk by chunk finds exactly the tokens of the whole text.
+_CHUNK_END_RE = re.compile(r'(?<=[^.\s])\s')
+
+def text_chunks(text: str, chunk_chars: int = WINDOW_CHARS) -> Iterator[str]:
+    """Consecutive slices of ``text`` of at least ``chunk_chars`` characters (except the last) that tokenize independently."""
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+        if end < len(text):
+            boundary = _CHUNK_END_RE.search(text, end)
+            end = boundary.start() if boundary else len(text)
+        yield text[start:end]
+        start = end
+
+class WindowMatcher:
+    """
+    Greedy matching of one dictionary over a token stream fed in pieces.
+
+    Tokens are buffered until a match starting at a position can no longer
+    depend on tokens still to come (``max_words`` of lookahead), then matched.
+    Whatever the last match left unconsumed carries over to the next window,
+    so the windows overlap by fewer than ``max_words`` tokens.
+    """
+
+    def __init__(self, dict_data: DictionaryData, capture: Optional[str] = None,
+                 truncate_chars: Optional[int] = None):
+        self.root = dict_data.standards_trie.root
+        self.wildcard_index = dict_data.wildcard_index
+        self.max_words = max(1, dict_data.max_words)
+        self.capture = CAPTURE_MODES[capture]
+        self.offsets = capture == "offsets"
+        self.truncate_chars = truncate_chars
+        self.concept_counts: Dict[str, int] = {}
+        self.num_matched_tokens = 0
+        self.nonmatched_count = 0
+        self.nonmatched_types: Set[str] = set()
+        self.captured: list = []
+        self._captured_chars = -1    # len(' '.join(self.captured))
+        self._pending: List[str] = []
+        self._base = 0               # position of self._pending[0] in the whole token stream
+
+    def feed(self, words: List[str]):
+        self._pending += words
+        if len(self._pending) >= self.max_words:
+            self._match(len(self._pending) - self.max_words + 1)
+
+    def finish(self):
+        self._match(len(self._pending))
+
+    def _match(self, stop: int):
+        captured: list = []
+        nonmatched: List[str] = []
+        end, num_matched_tokens = match_span(self.root, self.wildcard_index, self.max_words, self._pending, 0, stop,
+                                             self.capture, self.concept_counts, captured, nonmatched)
+        self.num_matched_tokens += num_matched_tokens
+        self.nonmatched_count += len(nonmatched)
+        self.nonmatched_types.update(nonmatched)
+        if self.offsets:
+            base = self._base
+            captured = [(first + base, last + base) for first, last in captured]
+        self._keep_captured(captured)
+        del self._pending[:end]
+        self._base += end
+
+    def _keep_captured(self, captured: list):
+        if self.truncate_chars is None:
+            self.captured += captured
+            return
+        # Only what ' '.join(...)[:truncate_chars] will show is kept
+        for text in captured:
+            if self._captured_chars >= self.truncate_chars:
+                return
+            self.captured.append(text)
+            self._captured_chars += len(text) + 1
+
+def score_windowed(text: str, tokenizer: TwitterAwareTokenizer, stop_remover: StopWordRemover,
+                   dictionaries: List[DictionaryData], whitespace_method: str, capture: Optional[str] = None,
+                   truncate_chars: Optional[int] = None, stats: Optional[AnalysisStats] = None,
+                   chunk_chars: Optional[int] = None) -> Tuple[int, int, int, int, int, List[WindowMatcher]]:
+    """
+    Tokenize and match ``text`` chunk by chunk.
+
+    Returns the whitespace word count, the raw and cleaned token counts, the
+    raw and cleaned type counts, and a finished ``WindowMatcher`` per
+    dictionary, all equal to what ``tokenize_for_analysis`` followed by
+    ``match_dictionary`` give for the whole text.
+    """
+    matchers = [WindowMatcher(dict_data, capture, truncate_chars) for dict_data in dictionaries]
+    stopwords = stop_remover.stopwords
+    wc = tc_raw = tc_clean = 0
+    types_raw: Set[str] = set()
+    types_clean: Set[str] = set()
+    for chunk in text_chunks(text, chunk_chars or WINDOW_CHARS):
+        t0 = perf_counter() if stats is not None else 0.0
+        wc += count_whitespace_words(chunk, whitespace_method)
+        words_raw = tokenizer.tokenize(chunk)
+        words_clean = remove_stopwords(words_raw, stopwords)
+        t1 = perf_counter() if stats is not None else 0.0
+        tc_raw += len(words_raw)
+        tc_clean += len(words_clean)
+        types_raw.update(words_raw)
+        types_clean.update(words_clean)
+        del words_raw
+        for matcher in matchers:
+            matcher.feed(words_clean)
+        if stats is not None:
+            stats.add("tokenize", t1 - t0)
+            stats.add("match", perf_counter() - t1)
+    for matcher in matchers:
+        matcher.finish()
+    if stats is not None:
+        stats.add_text(tc_raw)
+    return wc, tc_raw, tc_clean, len(types_raw), len(types_clean), matchers
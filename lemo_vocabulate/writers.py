@@ -0,0 +1,202 @@
+"""
+Incremental result writers for CSV, Parquet and Feather (Arrow IPC) output
+"""
+import shutil
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Type
+import numpy as np
+import pandas as pd
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Writing Parquet or Feather requires pyarrow: pip install lemo-vocabulate[parquet]")
+    return pyarrow
+
+def arrow_schema(schema: dict):
+    """The pyarrow schema for a ``scoring._result_schema`` column → dtype mapping."""
+    pa = _require_pyarrow()
+    types = {np.dtype(np.int64): pa.int64(), np.dtype(np.float64): pa.float64()}
+    return pa.schema([(name, types.get(np.dtype(dtype), pa.string())) for name, dtype in schema.items()])
+
+class ResultWriter:
+    """
+    Base class for writers that receive results one chunk at a time.
+
+    A writer is created with the full result schema before any rows are
+    scored, so every chunk is written with the same column names and types
+    however many rows it holds (including category columns that are all
+    zero in a given chunk). ``write`` accepts a DataFrame or a mapping of
+    column name to array, as produced by ``scoring._ResultColumns.to_columns``.
+
+    Subclasses implement ``_write`` and, if needed, ``close``. Writers are
+    context managers.
+    """
+
+    def __init__(self, path, schema: dict):
+        self.path = Path(path)
+        self.schema = schema
+        self.names = list(schema)
+        self.rows = 0
+
+    def write(self, columns: Mapping):
+        n_rows = len(columns[self.names[0]])
+        if n_rows:
+            self._write(columns)
+            self.rows += n_rows
+
+    def _write(self, columns: Mapping):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @classmethod
+    def concat(cls, paths: List[Path], output_path):
+        """Join finished output files, in order, into one file at ``output_path``."""
+        raise NotImplementedError(f"{cls.__name__} cannot merge output files.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CSVWriter(ResultWriter):
+    """CSV output, appended chunk by chunk with the header written once."""
+
+    def __init__(self, path, schema: dict, sep: str = ",", quotechar: str = '"'):
+        super().__init__(path, schema)
+        self.sep = sep
+        self.quotechar = quotechar
+        # Truncate now so an empty run still leaves a header-only file
+        pd.DataFrame(columns=self.names).to_csv(self.path, index=False, sep=sep, quotechar=quotechar)
+
+    def _write(self, columns: Mapping):
+        frame = columns if isinstance(columns, pd.DataFrame) else pd.DataFrame(columns, columns=self.names)
+        frame.to_csv(self.path, mode="a", header=False, index=False, sep=self.sep, quotechar=self.quotechar)
+
+    @classmethod
+    def concat(cls, paths: List[Path], output_path):
+        # Byte-level: keeps the first header and every data row exactly as written
+        with open(output_path, "wb") as out:
+            for i, path in enumerate(paths):
+                with open(path, "rb") as f:
+                    if i:
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+
+class ParquetWriter(ResultWriter):
+    """Parquet output; each chunk is flushed to disk as its own row group."""
+
+    def __init__(self, path, schema: dict, compression: str = "snappy", row_group_size: Optional[int] = None):
+        super().__init__(path, schema)
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        self.arrow_schema = arrow_schema(schema)
+        self.row_group_size = row_group_size
+        self._writer = pq.ParquetWriter(str(self.path), self.arrow_schema, compression=compression)
+
+    def _write(self, columns: Mapping):
+        table = _to_table(columns, self.arrow_schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    @classmethod
+    def concat(cls, paths: List[Path], output_path, compression: str = "snappy"):
+        # Copies row groups one at a time, so memory is bounded by the largest row group
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for path in paths:
+                source = pq.ParquetFile(str(path))
+                if writer is None:
+                    writer = pq.ParquetWriter(str(output_path), source.schema_arrow, compression=compression)
+                for i in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(i))
+        finally:
+            if writer is not None:
+                writer.close()
+
+class FeatherWriter(ResultWriter):
+    """Feather (Arrow IPC file) output; each chunk is written as a record batch."""
+
+    def __init__(self, path, schema: dict, compression: Optional[str] = None):
+        super().__init__(path, schema)
+        pa = _require_pyarrow()
+        self.arrow_schema = arrow_schema(schema)
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        self._sink = pa.OSFile(str(self.path), "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.arrow_schema, options=options)
+
+    def _write(self, columns: Mapping):
+        for batch in _to_table(columns, self.arrow_schema).to_batches():
+            self._writer.write_batch(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+
+    @classmethod
+    def concat(cls, paths: List[Path], output_path, compression: Optional[str] = None):
+        pa = _require_pyarrow()
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = None
+        with pa.OSFile(str(output_path), "wb") as sink:
+            for path in paths:
+                with pa.memory_map(str(path)) as source:
+                    reader = pa.ipc.open_file(source)
+                    if writer is None:
+                        writer = pa.ipc.new_file(sink, reader.schema, options=options)
+                    for i in range(reader.num_record_batches):
+                        writer.write_batch(reader.get_batch(i))
+            if writer is not None:
+                writer.close()
+
+def _to_table(columns: Mapping, schema):
+    import pyarrow as pa
+    return pa.Table.from_arrays(
+        [pa.array(np.asarray(columns[field.name]), type=field.type, from_pandas=True) for field in schema],
+        schema=schema)
+
+WRITERS: Dict[str, Type[ResultWriter]] = {
+    ".csv": CSVWriter,
+    ".parquet": ParquetWriter,
+    ".feather": FeatherWriter,
+    ".arrow": FeatherWriter,
+}
+
+def register_writer(suffix: str, writer: Type[ResultWriter]):
+    """Use ``writer`` for output paths ending in ``suffix`` (e.g. ".orc")."""
+    WRITERS[suffix.lower()] = writer
+
+def writer_class(path, format: Optional[str] = None) -> Type[ResultWriter]:
+    """
+    The writer class for ``path``.
+
+    ``format`` ("csv", "parquet", "feather", or any registered suffix)
+    overrides detection from the file suffix; unknown suffixes are written
+    as CSV.
+    """
+    suffix = "." + format.lower().lstrip(".") if format else Path(path).suffix.lower()
+    if format and suffix not in WRITERS:
+        raise ValueError(f"Unknown output format '{format}'; expected one of {sorted(WRITERS)}.")
+    return WRITERS.get(suffix, CSVWriter)
+
+def open_writer(path, schema: dict, format: Optional[str] = None, **options) -> ResultWriter:
+    """Create the writer for ``path``; ``options`` are passed to it, e.g. ``compression`` for Parquet."""
+    return writer_class(path, format)(path, schema, **options)
+
+def merge_results(paths: List[Path], output_path, format: Optional[str] = None):
+    """Concatenate result files of one format, in order, into ``output_path``; see ``ResultWriter.concat``."""
+    if not paths:
+        raise ValueError("No result files to merge.")
+    writer_class(output_path, format).concat([Path(path) for path in paths], output_path)
@@ -0,0 +1,24 @@
+"""
+Optional compiled build of lemo_vocabulate/_speedups.py; all other settings are in pyproject.toml.
+
+When Cython and a C compiler are available the hot loops are compiled;
+otherwise (or with LEMO_VOCABULATE_PURE_PYTHON=1) the package installs as
+pure Python and uses the same module uncompiled.
+"""
+import os
+from setuptools import setup
+
+def extensions():
+    if os.environ.get("LEMO_VOCABULATE_PURE_PYTHON", "") not in ("", "0"):
+        return []
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        return []
+    modules = cythonize(["lemo_vocabulate/_speedups.py"], compiler_directives={"language_level": 3}, quiet=True)
+    for module in modules:
+        # A failed compile is a warning, not a failed install
+        module.optional = True
+    return modules
+
+setup(ext_modules=extensions())